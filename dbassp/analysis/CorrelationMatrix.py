@@ -2,13 +2,12 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+from csv_cache import load_csv_cached
 
 
 file = input("Enter the CSV file name (without .csv): ") + ".csv"
 path = os.path.join("data", "output", file)
 
-df = pd.read_csv(path)
-
 cols_to_drop = [
     'Peptide ID', 'reference', 'lower_concentration', 'upper_concentration',
     #unif'lower_uM', 
@@ -24,14 +23,20 @@ cols_to_drop = [
     'Normalized Hydrophobic Moment'
 ]
 
-df_temp = df.drop(columns=[c for c in cols_to_drop if c in df.columns], errors='ignore')
-numeric_cols = df_temp.select_dtypes(include='number').columns
-rows_with_data = df_temp[numeric_cols].notna().any(axis=1)
+# Dropped columns are skipped by the parser (and left out of the cache)
+cols_to_drop_set = set(cols_to_drop)
+df = load_csv_cached(path, usecols=lambda c: c not in cols_to_drop_set)
+
+numeric_cols = df.select_dtypes(include='number').columns
+rows_with_data = df[numeric_cols].notna().any(axis=1)
 
 species_name = ""
 n_selected = None
 if 'species' in df.columns:
-    species_counts = df[rows_with_data].groupby(df['species']).size()
+    # Categorical species: counting and filtering work on integer codes, not strings
+    df['species'] = df['species'].astype('category')
+    species_counts = df.loc[rows_with_data, 'species'].value_counts()
+    species_counts = species_counts[species_counts > 0]
     species_list = sorted(species_counts.index)
     
     print("\nAvailable species:")
@@ -46,7 +51,8 @@ if 'species' in df.columns:
         selected_species = [species_list[i-1] for i in selected_indices if 1 <= i <= len(species_list)]
         
         if selected_species:
-            df = df[df['species'].isin(selected_species)]
+            codes = df['species'].cat.categories.get_indexer(selected_species)
+            df = df.loc[df['species'].cat.codes.isin(codes)]
             n_selected = species_counts[selected_species].sum()
             if len(selected_species) == 1:
                 species_name = f"_{selected_species[0].replace(' ', '_')}"
@@ -55,8 +61,6 @@ if 'species' in df.columns:
                 if len(selected_species) > 5:
                     species_name += "_and_more"
 
-df = df.drop(columns=[c for c in cols_to_drop if c in df.columns], errors='ignore')
-
 corr = df.corr(numeric_only=True)
 
 n_data = df.select_dtypes(include='number').dropna().shape[0]
@@ -15,6 +15,7 @@ import matplotlib.pyplot as plt
 import os
 import glob
 import sys
+from csv_cache import load_csv_cached
 
 # Get all activity_normalized CSV files from data/output directory
 output_dir = "data/output"
@@ -100,8 +101,8 @@ if selected_file is None:
 
     print(f"\nCargando archivo: {os.path.basename(selected_file)}")
 
-# Load the CSV file
-df = pd.read_csv(selected_file)
+# Load the CSV file (only the species column is plotted)
+df = load_csv_cached(selected_file, usecols=["species"])
 
 species_counts=df["species"].value_counts()
 
@@ -0,0 +1,46 @@
+# csv_cache.py
+# Feather cache for the CSV files loaded by the analysis scripts
+
+import glob
+import hashlib
+import os
+import pandas as pd
+
+
+def _cache_key(*parts):
+    """Short hash of repr(parts), for cache file names."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def load_csv_cached(path, usecols=None, **kwargs):
+    """
+    Load a CSV with pandas, caching the parsed DataFrame next to it as a Feather file.
+    usecols (a list of names or a callable, as in pd.read_csv) is resolved against the
+    CSV header and passed to the parser, so unused columns are never parsed or held.
+    The cache is <file>.<view>.<source>.feather, where <view> hashes the selected columns
+    and the other read_csv arguments and <source> the CSV's size and mtime, so a cache is
+    only reused for the same read of an unchanged file. When the CSV is parsed again, the
+    stale caches of the same view are removed.
+    """
+    columns = None
+    if usecols is not None:
+        header = pd.read_csv(path, nrows=0, **kwargs).columns
+        wanted = usecols if callable(usecols) else set(usecols).__contains__
+        columns = [c for c in header if wanted(c)]
+
+    base = os.path.splitext(path)[0]
+    view = _cache_key(columns, sorted(kwargs.items()))
+    st = os.stat(path)
+    feather_path = f"{base}.{view}.{_cache_key(st.st_size, st.st_mtime_ns)}.feather"
+    if os.path.exists(feather_path):
+        return pd.read_feather(feather_path)
+
+    df = pd.read_csv(path, usecols=columns, **kwargs)
+    for stale in glob.glob(f"{glob.escape(base)}.{view}.*.feather"):
+        os.remove(stale)
+    try:
+        df.to_feather(feather_path)
+    except Exception as e:
+        # Mixed-type columns (or missing pyarrow) just mean no cache
+        print(f"Could not write cache {feather_path} ({e})")
+    return df
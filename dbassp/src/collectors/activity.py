@@ -1,6 +1,8 @@
 # activity.py
 import csv
 import logging
+import orjson
+import tempfile
 from src.core import common
 from src.core.config import Config
 from src.core.exceptions import APIError, FileProcessingError
@@ -35,26 +37,46 @@ def get_unusual_amino_acids(peptide_json):
     names = [aa.get("modificationType", {}).get("name", "") for aa in unusual if aa.get("modificationType")]
     return ", ".join(filter(None, names))
 
-def collect_activity_keys(all_peptides):
-    exclude = {"id", "activity", "activityMeasureValue"}
-    order, seen = [], set()
-    for d in all_peptides:
-        for a in get_activities(d):
-            for k in a.keys():
-                if not k or k.lower() in exclude:
-                    continue
-                if k not in seen:
-                    seen.add(k)
-                    order.append(k)
-    return order
+# Activity keys never written as columns (compared against k.lower())
+_EXCLUDED_ACTIVITY_KEYS = frozenset({"id", "activity", "activityMeasureValue"})
+
+def scan_activity_keys(acts, seen, dict_keys):
+    """
+    Record the keys of one peptide's activities.
+    seen maps every key met so far to whether it is written as a column (insertion order
+    is column order); dict_keys collects written keys whose value is a dict somewhere.
+    """
+    for a in acts:
+        for k, v in a.items():
+            kept = seen.get(k)
+            if kept is None:
+                # Only new keys pay for the lower() + exclusion test
+                kept = seen[k] = bool(k) and k.lower() not in _EXCLUDED_ACTIVITY_KEYS
+            if kept and isinstance(v, dict):
+                dict_keys.add(k)
 
 def flatten_value(v):
     if v is None:
         return ""
     if isinstance(v, dict):
-        return v.get("name", str(v))
+        # str(v) only when there is no name (v.get("name", str(v)) would build it every time)
+        return v["name"] if "name" in v else str(v)
     return v
 
+def make_activity_values(activity_cols, dict_keys):
+    """
+    Build a function returning the activity columns of one activity dict as a list.
+    Only columns that can hold a dict go through flatten_value; None is left as is
+    elsewhere, since csv.writer writes it as "" just like flatten_value(None).
+    """
+    cols = tuple((k, k in dict_keys) for k in activity_cols)
+
+    def activity_values(a):
+        get = a.get
+        return [flatten_value(get(k)) if is_dict else get(k) for k, is_dict in cols]
+
+    return activity_values
+
 def run():
     logger.info("Starting activity data collection")
     
@@ -65,57 +87,69 @@ def run():
             return
 
         logger.info(f"Processing {len(ids)} peptides for activity data")
-        peptides = []
+        fetched = 0
         failed_peptides = []
+        seen_keys = {}
+        dict_keys = set()
+        # The header needs every activity key, so each peptide's base columns and activities
+        # are spooled to a JSONL temp file while the keys are collected; payloads are not kept
+        spool = tempfile.TemporaryFile("w+b")
         
-        for i, pid in enumerate(ids, start=1):
-            print(f"[{i}/{len(ids)}] Fetching activity for peptide {pid} ...", end="", flush=True)
-            try:
-                peptides.append(common.fetch(pid))
-                print(" ok")
-            except APIError as e:
-                logger.error(f"API error for peptide {pid}: {e}")
+        for pid, d in common.fetch_many(ids, label="activity"):
+            if d is None:
                 failed_peptides.append(pid)
-                print(f" fail (API error)")
-            except Exception as e:
-                logger.error(f"Unexpected error for peptide {pid}: {e}")
-                failed_peptides.append(pid)
-                print(f" fail (unexpected error)")
+                continue
+            base = (
+                str(d.get("id", "")),
+                (d.get("nTerminus") or {}).get("name", ""),
+                d.get("sequence", ""),
+                (d.get("cTerminus") or {}).get("name", ""),
+                get_unusual_amino_acids(d),
+                get_unusual_amino_acids_map(d),
+            )
+            acts = get_activities(d)
+            scan_activity_keys(acts, seen_keys, dict_keys)
+            spool.write(orjson.dumps((base, acts)))
+            spool.write(b"\n")
+            fetched += 1
 
         if failed_peptides:
             logger.warning(f"Failed to fetch {len(failed_peptides)} peptides: {failed_peptides}")
 
-        if not peptides:
+        if not fetched:
+            spool.close()
             logger.error("No data fetched; nothing to write.")
             return
 
-        logger.info(f"Successfully fetched data for {len(peptides)} peptides")
-        activity_cols = collect_activity_keys(peptides)
+        logger.info(f"Successfully fetched data for {fetched} peptides")
+        activity_cols = [k for k, kept in seen_keys.items() if kept]
+        # Only columns that ever hold a dict need flattening; None is written as "" by csv.writer
+        activity_values = make_activity_values(activity_cols, dict_keys)
         header = ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS", "Unusual Amino Acids", "Unusual Amino Acids Map"] + activity_cols
 
         try:
-            with open(Config.OUTPUT_ACTIVITY_CSV, "w", newline="", encoding=Config.CSV_ENCODING) as f:
-                w = csv.DictWriter(f, fieldnames=header)
-                w.writeheader()
-
-                for d in peptides:
-                    base = {
-                        "Peptide ID": str(d.get("id", "")),
-                        "N TERMINUS": (d.get("nTerminus") or {}).get("name", ""),
-                        "SEQUENCE": d.get("sequence", ""),
-                        "C TERMINUS": (d.get("cTerminus") or {}).get("name", ""),
-                        "Unusual Amino Acids": get_unusual_amino_acids(d),
-                        "Unusual Amino Acids Map": get_unusual_amino_acids_map(d),
-                    }
-                    acts = get_activities(d)
-                    if not acts:
-                        w.writerow(base)
-                        continue
-                    for a in acts:
-                        row = dict(base)
-                        for k in activity_cols:
-                            row[k] = flatten_value(a.get(k))
-                        w.writerow(row)
+            with spool, common.open_output_csv(Config.OUTPUT_ACTIVITY_CSV, buffering=Config.CSV_BUFFER_BYTES) as f:
+                w = csv.writer(f)
+                w.writerow(header)
+                n_base = len(header) - len(activity_cols)
+                empty_activity = [""] * len(activity_cols)
+
+                def rows():
+                    # One row list is reused for every line; csv.writer serializes it immediately
+                    row = [""] * len(header)
+                    spool.seek(0)
+                    for line in spool:
+                        base, acts = orjson.loads(line)
+                        row[:n_base] = base
+                        if not acts:
+                            row[n_base:] = empty_activity
+                            yield row
+                            continue
+                        for a in acts:
+                            row[n_base:] = activity_values(a)
+                            yield row
+
+                w.writerows(rows())
                         
             logger.info(f"Successfully wrote activity data to {Config.OUTPUT_ACTIVITY_CSV}")
             
@@ -1,6 +1,9 @@
 import csv
+import functools
 import logging
 import math
+import os
+from collections import Counter
 from rdkit import Chem
 from rdkit.Chem import AllChem, Descriptors
 from src.core import common
@@ -34,6 +37,9 @@ BASIC_AA_PKA = {
     'J': 9.43,   # Diaminopropionic acid (pKb=4.57)
 }
 
+# Template atom for the AMD edit (ReplaceAtom copies it)
+_NITROGEN = Chem.Atom(7)
+
 # Terminal group pKa values
 N_TERMINUS_PKA = 9.0   # NH3+ group
 C_TERMINUS_PKA = 3.5   # COOH group
@@ -42,6 +48,8 @@ def get_modification_smiles(nterminus: str) -> str | None:
     """Get SMILES for N-terminal modification (C12, C16, etc.)."""
     return N_TERMINUS_MODIFICATIONS.get(nterminus)
 
+# RDKit work is memoized: DBAASP has many peptides with identical sequences/termini
+@functools.lru_cache(maxsize=4096)
 def sequence_to_smiles(sequence: str, nterminus: str | None = None, cterminus: str | None = None) -> str | None:
     """
     Convert peptide sequence to SMILES string.
@@ -69,32 +77,29 @@ def sequence_to_smiles(sequence: str, nterminus: str | None = None, cterminus: s
             # This is done by editing the molecule to replace OH with NH2
             mol = Chem.RWMol(mol)
             
-            # Find the C-terminal carboxyl oxygen (OH)
-            # Look for C(=O)O pattern at the end
-            for atom in mol.GetAtoms():
-                if atom.GetSymbol() == 'O' and atom.GetTotalNumHs() == 1:  # OH group
-                    # Check if connected to carbonyl carbon
-                    for bond in atom.GetBonds():
-                        neighbor = bond.GetOtherAtom(atom)
-                        if neighbor.GetSymbol() == 'C':
-                            # Check if this carbon has a double-bonded oxygen (C=O)
-                            has_carbonyl = False
-                            for nbond in neighbor.GetBonds():
-                                other = nbond.GetOtherAtom(neighbor)
-                                if other.GetSymbol() == 'O' and nbond.GetBondType() == Chem.BondType.DOUBLE:
-                                    has_carbonyl = True
-                                    break
-                            
-                            if has_carbonyl:
-                                # Replace OH with NH2
-                                atom_idx = atom.GetIdx()
-                                mol.ReplaceAtom(atom_idx, Chem.Atom(7))  # 7 = Nitrogen
-                                mol.GetAtomWithIdx(atom_idx).SetNumExplicitHs(2)  # NH2
-                                break
-                    break
-            
-            mol = mol.GetMol()
+            # The first hydroxyl oxygen in atom order is taken as the C-terminal OH and the
+            # scan stops there; it is amidated only if its carbon also carries a C=O
+            for atom_idx in range(mol.GetNumAtoms()):
+                atom = mol.GetAtomWithIdx(atom_idx)
+                if atom.GetAtomicNum() != 8 or atom.GetTotalNumHs() != 1:
+                    continue
+                for bond in atom.GetBonds():
+                    neighbor = bond.GetOtherAtom(atom)
+                    if neighbor.GetSymbol() == 'C':
+                        # Check if this carbon has a double-bonded oxygen (C=O)
+                        has_carbonyl = any(
+                            nbond.GetOtherAtom(neighbor).GetSymbol() == 'O'
+                            and nbond.GetBondType() == Chem.BondType.DOUBLE
+                            for nbond in neighbor.GetBonds()
+                        )
+                        if has_carbonyl:
+                            # Replace OH with NH2
+                            mol.ReplaceAtom(atom_idx, _NITROGEN)  # copied by RDKit
+                            mol.GetAtomWithIdx(atom_idx).SetNumExplicitHs(2)  # NH2
+                            break
+                break
         
+        # An edited RWMol is written directly (no GetMol() copy)
         smiles = Chem.MolToSmiles(mol)
         
         # Handle N-terminus modification
@@ -108,6 +113,7 @@ def sequence_to_smiles(sequence: str, nterminus: str | None = None, cterminus: s
         logger.warning(f"Error generating SMILES for sequence {sequence}: {e}")
         return None
 
+@functools.lru_cache(maxsize=4096)
 def calculate_logp(smiles: str) -> float | None:
     """Calculate logP (partition coefficient) from SMILES."""
     try:
@@ -127,20 +133,37 @@ def count_ionizable_groups(sequence: str) -> dict:
     Count ionizable groups in peptide sequence.
     Returns dict with counts of acidic and basic residues.
     """
-    acidic_count = {}
-    basic_count = {}
-    
-    for aa in sequence.upper():
-        if aa in ACIDIC_AA_PKA:
-            acidic_count[aa] = acidic_count.get(aa, 0) + 1
-        elif aa in BASIC_AA_PKA:
-            basic_count[aa] = basic_count.get(aa, 0) + 1
+    # Counter keeps first-occurrence order, so the logD terms are summed in sequence order
+    counts = Counter(sequence.upper())
+    acidic_count = {aa: n for aa, n in counts.items() if aa in ACIDIC_AA_PKA}
+    basic_count = {aa: n for aa, n in counts.items() if aa in BASIC_AA_PKA}
     
     return {
         'acidic': acidic_count,
         'basic': basic_count
     }
 
+_LN10 = math.log(10)
+
+def _log10_1p_pow10(x: float) -> float:
+    """log10(1 + 10^x) without overflow for large x or cancellation for very negative x."""
+    if x > 0:
+        return x + math.log1p(10.0 ** -x) / _LN10
+    return math.log1p(10.0 ** x) / _LN10
+
+@functools.lru_cache(maxsize=None)
+def _ionization_terms(ph: float):
+    """
+    Henderson-Hasselbalch terms log10(1 + 10^(±(pH - pKa))) at a given pH, computed once per pH:
+    ({acidic aa: term}, {basic aa: term}, N-terminus term, C-terminus term).
+    """
+    acidic = {aa: _log10_1p_pow10(ph - pka) for aa, pka in ACIDIC_AA_PKA.items()}
+    basic = {aa: _log10_1p_pow10(pka - ph) for aa, pka in BASIC_AA_PKA.items()}
+    n_term = _log10_1p_pow10(N_TERMINUS_PKA - ph)
+    c_term = _log10_1p_pow10(ph - C_TERMINUS_PKA)
+    return acidic, basic, n_term, c_term
+
+@functools.lru_cache(maxsize=4096)
 def calculate_logd(smiles: str, sequence: str = None, ph: float = 7.4, 
                    nterminus: str = None, cterminus: str = None) -> float | None:
     """
@@ -158,14 +181,12 @@ def calculate_logd(smiles: str, sequence: str = None, ph: float = 7.4,
         logD value corrected for ionization, or None if calculation fails
     """
     try:
-        mol = Chem.MolFromSmiles(smiles)
-        if mol is None:
-            logger.warning(f"Invalid SMILES: {smiles}")
+        # Start with logP (partition coefficient of neutral form); memoized, so the
+        # molecule parsed for the logP column is not parsed again here
+        logp = calculate_logp(smiles)
+        if logp is None:
             return None
         
-        # Start with logP (partition coefficient of neutral form)
-        logp = Descriptors.MolLogP(mol)
-        
         # If no sequence provided, return logP (no ionization correction)
         if not sequence:
             logger.debug("No sequence provided for logD calculation, returning logP")
@@ -180,26 +201,22 @@ def calculate_logd(smiles: str, sequence: str = None, ph: float = 7.4,
         # Acidic groups: COOH -> COO- (lose proton at high pH)
         # At pH > pKa, group is deprotonated (charged)
         # Correction: -log10(1 + 10^(pH - pKa))
+        acidic_terms, basic_terms, n_term, c_term = _ionization_terms(ph)
         for aa, count in ionizable['acidic'].items():
-            pka = ACIDIC_AA_PKA[aa]
-            ionization_factor = 1 + 10**(ph - pka)
-            correction -= count * math.log10(ionization_factor)
+            correction -= count * acidic_terms[aa]
         
         # Basic groups: NH3+ -> NH2 (lose proton at high pH)
         # At pH < pKa, group is protonated (charged)
         # Correction: -log10(1 + 10^(pKa - pH))
         for aa, count in ionizable['basic'].items():
-            pka = BASIC_AA_PKA[aa]
-            ionization_factor = 1 + 10**(pka - ph)
-            correction -= count * math.log10(ionization_factor)
+            correction -= count * basic_terms[aa]
         
         # N-terminus correction (if not modified)
         # Modified N-terminus (C12, C16, etc.) is not ionizable
         has_free_n_terminus = not (nterminus and nterminus in N_TERMINUS_MODIFICATIONS)
         if has_free_n_terminus:
             # N-terminus: NH3+ (basic)
-            ionization_factor = 1 + 10**(N_TERMINUS_PKA - ph)
-            correction -= math.log10(ionization_factor)
+            correction -= n_term
         
         # C-terminus correction (if not amidated)
         # AMD (amidated) C-terminus is CONH2 (neutral, not ionizable)
@@ -207,8 +224,7 @@ def calculate_logd(smiles: str, sequence: str = None, ph: float = 7.4,
         has_free_c_terminus = not (cterminus and cterminus.upper() == "AMD")
         if has_free_c_terminus:
             # C-terminus: COOH (acidic)
-            ionization_factor = 1 + 10**(ph - C_TERMINUS_PKA)
-            correction -= math.log10(ionization_factor)
+            correction -= c_term
         
         logd = logp + correction
         
@@ -220,6 +236,23 @@ def calculate_logd(smiles: str, sequence: str = None, ph: float = 7.4,
         logger.warning(f"Error calculating logD for SMILES {smiles}: {e}")
         return None
 
+def lipophilicity_values(task):
+    """
+    (SMILES, logP, logD) for one (sequence, nterminus, cterminus) task, None if no SMILES
+    could be generated, or the exception raised.
+    """
+    sequence, nterminus, cterminus = task
+    try:
+        smiles = sequence_to_smiles(sequence, nterminus=nterminus, cterminus=cterminus)
+        if not smiles:
+            return None
+        logp = calculate_logp(smiles)
+        logd = calculate_logd(smiles, sequence=sequence, ph=7.0, 
+                             nterminus=nterminus, cterminus=cterminus)
+        return smiles, logp, logd
+    except Exception as e:
+        return e
+
 def run():
     logger.info("Starting lipophilicity data collection")
     
@@ -234,73 +267,84 @@ def run():
         
         logger.info(f"Processing {len(ids)} peptides for lipophilicity data")
         
-        data = []
         failed_peptides = []
+        peptides = []  # (pid, peptide id, sequence)
+        tasks = []     # (sequence, nterminus, cterminus) for lipophilicity_values
         
-        for i, pid in enumerate(ids, start=1):
-            print(f"[{i}/{len(ids)}] Fetching lipophilicity for peptide {pid} ...", end="", flush=True)
-            try:
-                peptide_data = common.fetch(pid)
-                
-                sequence = peptide_data.get("sequence", "").strip()
-                if not sequence:
-                    logger.warning(f"No sequence found for peptide {pid}")
-                    failed_peptides.append(pid)
-                    print(" fail (no sequence)")
-                    continue
-                
-                # Extract C-terminus information
-                cterminus_data = peptide_data.get("cTerminus") or {}
-                cterminus = (cterminus_data.get("name") or "").strip()
-                
-                # Generate SMILES with proper terminal modifications
-                smiles = sequence_to_smiles(sequence, nterminus=nterminus, cterminus=cterminus)
-                if not smiles:
-                    logger.warning(f"Failed to generate SMILES for peptide {pid}")
-                    failed_peptides.append(pid)
-                    print(" fail (SMILES generation)")
-                    continue
-                
-                logp = calculate_logp(smiles)
-                logd = calculate_logd(smiles, sequence=sequence, ph=7.0, 
-                                     nterminus=nterminus, cterminus=cterminus)
-                
-                data.append({
-                    "Peptide ID": str(peptide_data.get("id", "")),
-                    "N TERMINUS": nterminus,
-                    "SEQUENCE": sequence,
-                    "SMILES": smiles,
-                    "logP": logp if logp is not None else "",
-                    "logD": logd if logd is not None else "",
-                })
-                print(" ok")
-                
-            except APIError as e:
-                logger.error(f"API error for peptide {pid}: {e}")
+        # Peptides are fetched concurrently; only what the RDKit stage needs is kept
+        for pid, peptide_data in common.fetch_many(ids, label="lipophilicity"):
+            if peptide_data is None:
                 failed_peptides.append(pid)
-                print(f" fail (API error)")
-            except Exception as e:
-                logger.error(f"Unexpected error for peptide {pid}: {e}")
+                continue
+            sequence = (peptide_data.get("sequence") or "").strip()
+            if not sequence:
+                logger.warning(f"No sequence found for peptide {pid}")
                 failed_peptides.append(pid)
-                print(f" fail (unexpected error)")
-        
-        if failed_peptides:
-            logger.warning(f"Failed to process {len(failed_peptides)} peptides: {failed_peptides}")
-        
-        if not data:
-            logger.error("No data calculated; nothing to write.")
-            return
-        
-        logger.info(f"Successfully calculated lipophilicity for {len(data)} peptides")
+                print(f"Peptide {pid} ... fail (no sequence)")
+                continue
+            
+            # Extract C-terminus information
+            cterminus_data = peptide_data.get("cTerminus") or {}
+            cterminus = (cterminus_data.get("name") or "").strip()
+            
+            peptides.append((pid, str(peptide_data.get("id", "")), sequence))
+            tasks.append((sequence, nterminus, cterminus))
         
         header = ["Peptide ID", "N TERMINUS", "SEQUENCE", "SMILES", "logP", "logD"]
+        written = 0
+        # Rows are streamed to a temp file as they are calculated and moved into place at the end,
+        # so memory stays flat and an existing output is only replaced when there is data
+        tmp_file = f"{Config.OUTPUT_LIPOPHILICITY_CSV}.tmp"
         
         try:
-            with open(Config.OUTPUT_LIPOPHILICITY_CSV, "w", newline="", encoding=Config.CSV_ENCODING) as f:
-                w = csv.DictWriter(f, fieldnames=header)
-                w.writeheader()
-                w.writerows(data)
+            # Peptides sharing (sequence, nterminus, cterminus) are computed once
+            unique_tasks = list(dict.fromkeys(tasks))
+            try:
+                with common.open_output_csv(tmp_file) as f:
+                    w = csv.writer(f)
+                    w.writerow(header)
+                    
+                    by_task = {task: lipophilicity_values(task) for task in unique_tasks}
+                    
+                    for (pid, peptide_id, sequence), task in zip(peptides, tasks):
+                        result = by_task[task]
+                        if result is None:
+                            logger.warning(f"Failed to generate SMILES for peptide {pid}")
+                            failed_peptides.append(pid)
+                            print(f"Peptide {pid} ... fail (SMILES generation)")
+                            continue
+                        if isinstance(result, Exception):
+                            logger.error(f"Unexpected error for peptide {pid}: {result}")
+                            failed_peptides.append(pid)
+                            print(f"Peptide {pid} ... fail (unexpected error)")
+                            continue
+                        
+                        smiles, logp, logd = result
+                        w.writerow([
+                            peptide_id,
+                            nterminus,
+                            sequence,
+                            smiles,
+                            logp if logp is not None else "",
+                            logd if logd is not None else "",
+                        ])
+                        written += 1
+            except BaseException:
+                # A failed run leaves no partial temp file behind
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+            
+            if failed_peptides:
+                logger.warning(f"Failed to process {len(failed_peptides)} peptides: {failed_peptides}")
+            
+            if not written:
+                os.remove(tmp_file)
+                logger.error("No data calculated; nothing to write.")
+                return
             
+            logger.info(f"Successfully calculated lipophilicity for {written} peptides")
+            os.replace(tmp_file, Config.OUTPUT_LIPOPHILICITY_CSV)
             logger.info(f"Successfully wrote lipophilicity data to {Config.OUTPUT_LIPOPHILICITY_CSV}")
             
         except IOError as e:
@@ -10,8 +10,15 @@
 # + Join por NEW_SEQ con list_min.txt para curv_min, npol_min, ph_run, npol_c0, npol_c1, npol_c2
 
 import csv
+import functools
+import itertools
 import logging
+import os
 import re
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from src.core.common import open_output_csv
 from src.core.config import Config
 from src.core.exceptions import FileProcessingError, DataValidationError
 
@@ -20,9 +27,30 @@ logger = logging.getLogger("dbaasp_pipeline")
 # ─── Threshold ────────────────────────────────────────────────────────────────
 MIC_THRESHOLD_UGML = 32.0   # µg/mL — active if MIC <= this value
 
+# ─── Module-level patterns and unit tables (built once, not per row) ──────────
+_CARBON_RE     = re.compile(r'C(\d+)')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Unit → (multiplier, divisor, molar) for to_ugml: value × mul / div, then × MW/1000 for
+# molar units (µg/mL = µM × (MW g/mol) × (1 µg/µmol) = µM × MW/1000).
+# mul and div are separate because x / 1000.0 and x * 0.001 can round differently.
+_UNIT_TO_UGML = {
+    # Already µg/mL family — returned as-is
+    "µg/ml": (1.0, 1.0, False), "ug/ml": (1.0, 1.0, False), "μg/ml": (1.0, 1.0, False),
+    "mg/l":  (1.0, 1.0, False),
+    "mg/ml": (1_000.0, 1.0, False),
+    "g/l":   (1_000.0, 1.0, False), "g/ml": (1_000.0, 1.0, False),
+    "ng/ml": (1.0, 1_000.0, False), "ng/l": (1.0, 1_000.0, False),
+    # Molar units — need MW (Da = g/mol)
+    "µm":    (1.0, 1.0, True), "um": (1.0, 1.0, True), "μm": (1.0, 1.0, True),
+    "mm":    (1_000.0, 1.0, True),
+    "nm":    (1.0, 1_000.0, True),
+    "m":     (1_000_000.0, 1.0, True),
+}
+
 
 # ─── MW / sequence helpers ────────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=65536)
 def calc_mw(seq: str, nterm: str | None, cterm: str | None) -> float:
     """Calculate peptide molecular weight (Da)."""
     mw = sum(Config.AA_MASS.get(a.upper(), 110.0) for a in (seq or "")) + Config.H2O_MASS
@@ -33,26 +61,37 @@ def calc_mw(seq: str, nterm: str | None, cterm: str | None) -> float:
     return mw
 
 
+def calc_mw_batch(seqs, nterms, cterms) -> np.ndarray:
+    """calc_mw for each (SEQUENCE, N TERMINUS, C TERMINUS); repeated peptides hit calc_mw's cache."""
+    return np.fromiter(map(calc_mw, seqs, nterms, cterms), dtype=np.float64, count=len(seqs))
+
+
 def get_z_prefix(nterm: str | None) -> str:
     """
     Calculate the number of Z's based on N-terminus.
     Each Z represents a C4 block.
     Examples: C4->Z, C8->ZZ, C12->ZZZ, C16->ZZZZ, C20->ZZZZZ
     """
+    prefix, warning = _z_prefix(nterm)
+    if warning:
+        logger.warning(warning)  # logged on every call, not only the first
+    return prefix
+
+
+@functools.lru_cache(maxsize=256)
+def _z_prefix(nterm: str | None) -> tuple[str, str | None]:
+    """(prefix, warning message or None) for get_z_prefix; only a handful of distinct N-termini exist."""
     if not nterm:
-        logger.warning("No N-terminus provided, defaulting to C16 (ZZZZ)")
-        return "ZZZZ"
-    match = re.search(r'C(\d+)', nterm.upper())
+        return "ZZZZ", "No N-terminus provided, defaulting to C16 (ZZZZ)"
+    match = _CARBON_RE.search(nterm.upper())
     if match:
         num = int(match.group(1))
         z_count = num // 4
         if z_count > 0:
-            return "Z" * z_count
+            return "Z" * z_count, None
         else:
-            logger.warning(f"Invalid C value {num}, must be multiple of 4. Defaulting to C16 (ZZZZ)")
-            return "ZZZZ"
-    logger.warning(f"Could not parse N-terminus '{nterm}', defaulting to C16 (ZZZZ)")
-    return "ZZZZ"
+            return "ZZZZ", f"Invalid C value {num}, must be multiple of 4. Defaulting to C16 (ZZZZ)"
+    return "ZZZZ", f"Could not parse N-terminus '{nterm}', defaulting to C16 (ZZZZ)"
 
 
 # ─── Concentration parsing ─────────────────────────────────────────────────────
@@ -74,13 +113,25 @@ def parse_conc(val: str | None, row_num: int | None = None) -> tuple[str, str, i
     if not val:
         return ("", "", 0)
 
-    s = re.sub(r'\s+', ' ', str(val).strip())
+    lower, upper, conc_gt, warning = _parse_conc(str(val))
+    if warning:
+        row_info = f" (CSV row {row_num})" if row_num else ""
+        logger.warning(f"{warning}{row_info}")
+    return (lower, upper, conc_gt)
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse_conc(val: str) -> tuple[str, str, int, str | None]:
+    """
+    parse_conc without the logging: (lower_raw, upper_raw, conc_gt, warning or None).
+    Cached because the same concentration strings ("16", ">128", "2-4") recur across rows.
+    """
+    s = _WHITESPACE_RE.sub(' ', val.strip())
 
     # Skip malformed values like "4.5.5"
-    if s.count('.') > 2 or (s.count('.') > 1 and '±' not in s and '->' not in s and '-' not in s):
-        row_info = f" (CSV row {row_num})" if row_num else ""
-        logger.warning(f"Malformed concentration value skipped: '{s}'{row_info}")
-        return ("", "", 0)
+    dots = s.count('.')
+    if dots > 2 or (dots > 1 and '±' not in s and '->' not in s and '-' not in s):
+        return ("", "", 0, f"Malformed concentration value skipped: '{s}'")
 
     # mean ± error
     if "±" in s:
@@ -90,43 +141,76 @@ def parse_conc(val: str | None, row_num: int | None = None) -> tuple[str, str, i
             err = float(parts[1].strip())
             lower = max(0.0, mu - err)
             upper = mu + err
-            return (f"{lower:.6g}", f"{upper:.6g}", 0)
+            return (f"{lower:.6g}", f"{upper:.6g}", 0, None)
         except ValueError:
-            row_info = f" (CSV row {row_num})" if row_num else ""
-            logger.warning(f"Invalid mean±error format: '{s}'{row_info}")
-            return ("", "", 0)
+            return ("", "", 0, f"Invalid mean±error format: '{s}'")
 
     # Arrow range "A->B"
     if "->" in s:
         a, b = s.split("->", 1)
-        return (a.strip(), b.strip(), 0)
+        return (a.strip(), b.strip(), 0, None)
 
     # >=X or >X  →  lower = X, conc_gt = 1
     if s.startswith(">="):
-        return (s[2:].strip(), "", 1)
+        return (s[2:].strip(), "", 1, None)
     if s.startswith(">"):
-        return (s[1:].strip(), "", 1)
+        return (s[1:].strip(), "", 1, None)
 
     # <=X or <X  →  upper = X only
     if s.startswith("<="):
-        return ("", s[2:].strip(), 0)
+        return ("", s[2:].strip(), 0, None)
     if s.startswith("<"):
-        return ("", s[1:].strip(), 0)
+        return ("", s[1:].strip(), 0, None)
 
     # A-B interval (avoid splitting negative numbers)
     if "-" in s and not s.startswith("-"):
         parts = s.split("-", 1)
         if len(parts) == 2 and parts[0].strip() and parts[1].strip():
-            return (parts[0].strip(), parts[1].strip(), 0)
+            return (parts[0].strip(), parts[1].strip(), 0, None)
 
     # Single value → lower = upper = X
-    return (s, s, 0)
+    return (s, s, 0, None)
+
+
+@functools.lru_cache(maxsize=None)
+def _unit_conversion(unit: str) -> tuple[float, float, bool] | None:
+    """
+    Look up the _UNIT_TO_UGML entry for a raw unit string, or None if unknown.
+    Cached because the file holds only a handful of distinct unit spellings.
+    """
+    u = unit.strip().lower()
+    # Normalise encoding artefacts (µ can arrive as various byte sequences)
+    u = u.replace("\xc2\xb5", "µ").replace("\xb5", "µ").replace("?", "µ").replace("\ufffd", "µ")
+    return _UNIT_TO_UGML.get(u)
 
 
 def to_ugml(val: str, unit: str | None, mw: float | None, row_num: int | None = None) -> str:
     """Convert one numeric concentration value to µg/mL. Returns '' if not possible."""
     if not val or not unit or not mw:
         return ""
+    return _convert_ugml(val, _unit_conversion(unit), unit, mw, row_num)
+
+
+def to_ugml_pair(lo: str, up: str, unit: str | None, mw: float | None,
+                 row_num: int | None = None) -> tuple[str, str]:
+    """
+    to_ugml for a row's lower and upper bound. The unit is resolved once, and an
+    upper bound equal to the lower one (single values) reuses its result.
+    """
+    if not unit or not mw:
+        return ("", "")
+    conv = _unit_conversion(unit)
+    lo_ugml = _convert_ugml(lo, conv, unit, mw, row_num) if lo else ""
+    if lo_ugml and up == lo:
+        return (lo_ugml, lo_ugml)
+    # Converted again when lo failed, so its warning is logged for both bounds as before
+    up_ugml = _convert_ugml(up, conv, unit, mw, row_num) if up else ""
+    return (lo_ugml, up_ugml)
+
+
+def _convert_ugml(val: str, conv: tuple[float, float, bool] | None, unit: str, mw: float,
+                  row_num: int | None) -> str:
+    """to_ugml body, given the resolved _unit_conversion(unit)."""
     try:
         num = float(val)
     except ValueError:
@@ -134,30 +218,12 @@ def to_ugml(val: str, unit: str | None, mw: float | None, row_num: int | None =
         logger.warning(f"Invalid concentration value: '{val}'{row_info}")
         return ""
 
-    u = (unit or "").strip().lower()
-    # Normalise encoding artefacts (µ can arrive as various byte sequences)
-    u = u.replace("\xc2\xb5", "µ").replace("\xb5", "µ").replace("?", "µ").replace("\ufffd", "µ")
-
-    # Already µg/mL family — return as-is
-    if u in ("µg/ml", "ug/ml", "μg/ml", "mg/l"):
-        return f"{num:.6g}"
-    if u == "mg/ml":
-        return f"{num * 1_000.0:.6g}"
-    if u in ("g/l", "g/ml"):
-        return f"{num * 1_000.0:.6g}"
-    if u in ("ng/ml", "ng/l"):
-        return f"{num / 1_000.0:.6g}"
-
-    # Molar units — need MW (Da = g/mol)
-    #   µg/mL = µM × (MW g/mol) × (1 µg/µmol) = µM × MW/1000
-    if u in ("µm", "um", "μm"):
-        return f"{num * (mw / 1_000.0):.6g}"
-    if u == "mm":
-        return f"{num * 1_000.0 * (mw / 1_000.0):.6g}"
-    if u == "nm":
-        return f"{num / 1_000.0 * (mw / 1_000.0):.6g}"
-    if u == "m":
-        return f"{num * 1_000_000.0 * (mw / 1_000.0):.6g}"
+    if conv is not None:
+        mul, div, molar = conv
+        v = num * mul / div
+        if molar:
+            v *= mw / 1_000.0
+        return f"{v:.6g}"
 
     row_info = f" (CSV row {row_num})" if row_num else ""
     logger.warning(f"Unknown unit '{unit}' — cannot convert to µg/mL{row_info}")
@@ -203,11 +269,13 @@ def classify_activity(lower_ugml: str, upper_ugml: str, conc_gt: int) -> str:
 
 # ─── Species splitter ──────────────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=65536)
 def split_species(val: str | None) -> tuple[str, str]:
     """
     Split 'Genus species STRAIN' into (species, strain).
     The strain starts at the first token (after word 1) that begins with
     an uppercase letter or a digit.
+    Cached because each target species recurs across many activity rows.
     """
     if not val:
         return ("", "")
@@ -221,49 +289,96 @@ def split_species(val: str | None) -> tuple[str, str]:
 
 # ─── Min-list loader ───────────────────────────────────────────────────────────
 
+# Value columns of list_min.txt, in the order load_min_map returns them
+MIN_LIST_COLS = ["curv_min", "npol_min", "ph_run", "npol_c0", "npol_c1", "npol_c2"]
+
 def load_min_map(path: str = None):
     """
     Read list_min.txt (space/tab-separated) and return:
         {sequence → (curv_min, npol_min, ph_run, npol_c0, npol_c1, npol_c2)}
     Returns {} on any problem.
+    The parsed map is cached per (path, mtime) and shared between callers; do not modify it.
     """
     if path is None:
         path = Config.MIN_LIST_FILE
 
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return _load_min_map(path)  # missing file: warn (and retry) on every call
+    return _load_min_map_cached(path, mtime)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_min_map_cached(path: str, mtime: int):
+    return _load_min_map(path)
+
+
+# list_min.txt header names, in the order the tuple is stored
+_MIN_LIST_SOURCE_COLS = ["curv_min", "npol_min", "pH", "npol_c0", "npol_c1", "npol_c2"]
+
+
+def _load_min_map(path: str):
+    try:
+        # Tokenized in C; every field stays a string, quotes are not special (as with str.split)
+        df = pd.read_csv(
+            path,
+            sep=r"\s+",
+            dtype=str,
+            na_filter=False,
+            index_col=False,
+            quoting=csv.QUOTE_NONE,
+            encoding=Config.CSV_ENCODING,
+        )
+    except FileNotFoundError:
+        logger.warning(f"Min list file not found: {path}")
+        return {}
+    except pd.errors.EmptyDataError:
+        logger.warning(f"Missing required columns in {path}: 'sequence' is not in list")
+        return {}
+    except pd.errors.ParserError:
+        # Rows with extra fields: fall back to the line-by-line reader
+        return _load_min_map_lines(path)
+    except (IOError, UnicodeDecodeError) as e:
+        logger.error(f"Error reading min list file {path}: {e}")
+        return {}
+
+    for col in ["sequence", "npol_min", "curv_min", "pH", "npol_c0", "npol_c1", "npol_c2"]:
+        if col not in df.columns:
+            logger.warning(f"Missing required columns in {path}: '{col}' is not in list")
+            return {}
+
+    # Short rows come back as NaN; "NA" means no value
+    df = df[["sequence", *_MIN_LIST_SOURCE_COLS]].fillna("").replace("NA", "")
+    df = df[df["sequence"] != ""]
+    seqs = df["sequence"].tolist()
+    values = zip(*(df[c].tolist() for c in _MIN_LIST_SOURCE_COLS))
+    return dict(zip(seqs, values))
+
+
+def _load_min_map_lines(path: str):
     mapping = {}
     try:
         with open(path, encoding=Config.CSV_ENCODING) as f:
-            header = f.readline().strip().split()
+            header = f.readline().split()
             try:
-                idx_seq     = header.index("sequence")
-                idx_npol    = header.index("npol_min")
-                idx_curv    = header.index("curv_min")
-                idx_ph      = header.index("pH")
-                idx_npol_c0 = header.index("npol_c0")
-                idx_npol_c1 = header.index("npol_c1")
-                idx_npol_c2 = header.index("npol_c2")
+                # Checked in this order, so the first missing column is the one reported
+                idx = {c: header.index(c) for c in ("sequence", "npol_min", "curv_min", "pH",
+                                                    "npol_c0", "npol_c1", "npol_c2")}
             except ValueError as e:
                 logger.warning(f"Missing required columns in {path}: {e}")
                 return mapping
+            idx_seq = idx["sequence"]
+            want = tuple(idx[c] for c in _MIN_LIST_SOURCE_COLS)  # in the order the tuple is stored
 
             for line in f:
-                if not line.strip():
+                cols = line.split()  # split() drops surrounding whitespace; blank lines give []
+                n = len(cols)
+                if n <= idx_seq or cols[idx_seq] == "NA":
                     continue
-                cols = line.strip().split()
-                def _get(idx):
-                    v = cols[idx] if len(cols) > idx else ""
-                    return "" if v == "NA" else v
-
-                seq = _get(idx_seq)
-                if seq:
-                    mapping[seq] = (
-                        _get(idx_curv),
-                        _get(idx_npol),
-                        _get(idx_ph),
-                        _get(idx_npol_c0),
-                        _get(idx_npol_c1),
-                        _get(idx_npol_c2),
-                    )
+                mapping[cols[idx_seq]] = tuple(
+                    "" if (v := cols[i] if i < n else "") == "NA" else v for i in want
+                )
     except FileNotFoundError:
         logger.warning(f"Min list file not found: {path}")
     except IOError as e:
@@ -271,12 +386,171 @@ def load_min_map(path: str = None):
     return mapping
 
 
+
 # ─── Main entry point ──────────────────────────────────────────────────────────
 
+# Rows normalized and written per batch; bounds memory for large activity files
+NORMALIZE_CHUNK_ROWS = 50_000
+
+
+def _csv_batches(reader, width):
+    """
+    Yield batches of NORMALIZE_CHUNK_ROWS rows from a csv.reader (past the header) as
+    column lists. Blank lines are skipped and ragged rows padded with None / truncated,
+    as csv.DictReader would read them.
+    """
+    rows = (row for row in reader if row)
+    while True:
+        chunk = list(itertools.islice(rows, NORMALIZE_CHUNK_ROWS))
+        if not chunk:
+            return
+        for row in chunk:
+            if len(row) != width:
+                row[:] = (row + [None] * width)[:width]
+        yield [list(c) for c in zip(*chunk)]
+
+
+def _normalize_columns(header, columns, first_row_num, min_df):
+    """
+    Normalize one batch of activity rows, given as one list of strings per input column.
+    first_row_num is the CSV row number of the first row, used in warnings.
+    Returns the output columns as lists, in _output_fieldnames order.
+    """
+    n_rows = len(columns[0]) if columns else 0
+    # A repeated header name maps to its last column, like a DictReader row dict
+    col_idx = {name: i for i, name in enumerate(header)}
+
+    def column(name, default):
+        i = col_idx.get(name)
+        return columns[i] if i is not None else [default] * n_rows
+
+    seqs, nterms, cterms = column("SEQUENCE", None), column("N TERMINUS", ""), column("C TERMINUS", "")
+    concs, units, species = column("concentration", ""), column("unit", ""), column("targetSpecies", "")
+
+    # MW, NEW_SEQ and the min-list entry depend only on (SEQUENCE, N TERMINUS, C TERMINUS):
+    # computed once per distinct peptide below and broadcast to its rows through codes
+    peptide_idx = {}
+    codes = np.fromiter(
+        (peptide_idx.setdefault(key, len(peptide_idx)) for key in zip(seqs, nterms, cterms)),
+        dtype=np.intp, count=n_rows,
+    )
+    u_seqs, u_nterms, u_cterms = zip(*peptide_idx) if peptide_idx else ((), (), ())
+
+    # Molecular weight of each distinct peptide
+    u_mws = calc_mw_batch(u_seqs, u_nterms, u_cterms)
+    mws = u_mws[codes]
+
+    # Z-prefix warnings are per N terminus, but logged once per affected row, as get_z_prefix does
+    z_warnings = {nt: _z_prefix(nt or "")[1] for nt in set(nterms)}
+    z_warning_for = z_warnings.get if any(z_warnings.values()) else None
+
+    conc_gt, lower_ugml, upper_ugml, species_col, strain_col, activity = [], [], [], [], [], []
+    # Helpers bound to locals: the body below runs once per activity row
+    parse, convert, split, classify = parse_conc, to_ugml_pair, split_species, classify_activity
+    row_num = first_row_num - 1
+    for conc, unit, target, mw, nt in zip(concs, units, species, mws.tolist(), nterms):
+        row_num += 1
+
+        lo, up, gt = parse(conc, row_num)
+        conc_gt.append(gt)
+
+        # Between the concentration and conversion warnings, where the row-wise version logged it
+        if z_warning_for and (z_warning := z_warning_for(nt)):
+            logger.warning(z_warning)
+
+        lo_ugml, up_ugml = convert(lo, up, unit, mw, row_num)
+        lower_ugml.append(lo_ugml)
+        upper_ugml.append(up_ugml)
+
+        sp, st = split(target)
+        species_col.append(sp)
+        strain_col.append(st)
+
+        # Activity classification
+        activity.append(classify(lo_ugml, up_ugml, gt))
+
+    # Peptide-level columns, broadcast to the rows
+    u_new_seq = [
+        _z_prefix(nt or "")[0] + (sq or "").upper() + ("01" if (ct or "").upper() == "AMD" else "00")
+        for sq, nt, ct in peptide_idx
+    ]
+    derived = {
+        "MW_Da": np.array([f"{mw:.2f}" for mw in u_mws.tolist()], dtype=object)[codes].tolist(),
+        "NEW_SEQ": np.array(u_new_seq, dtype=object)[codes].tolist(),
+        "conc_gt": conc_gt, "lower_ugml": lower_ugml, "upper_ugml": upper_ugml,
+        "species": species_col, "strain": strain_col, "activity": activity,
+    }
+
+    # Min-list join on NEW_SEQ — exact match only.
+    # 00 (AMD) and 01 (non-AMD) are different simulations; never cross-assign.
+    if min_df is not None:
+        u_min = min_df.reindex(u_new_seq).fillna("").to_numpy()[codes]
+        derived.update((name, u_min[:, j].tolist()) for j, name in enumerate(MIN_LIST_COLS))
+    else:
+        derived.update((name, [""] * n_rows) for name in MIN_LIST_COLS)
+
+    # Positional, since a header name may repeat: an input name maps to its last column
+    # and a derived name overrides any input column of that name, as in a row dict
+    return [
+        derived[name] if name in derived else columns[col_idx[name]]
+        for name in _output_fieldnames(header)
+    ]
+
+
+def _output_fieldnames(header):
+    """Output CSV columns: the input header followed by the derived columns."""
+    return header + [
+        "MW_Da", "NEW_SEQ",
+        "conc_gt",               # 1 if original was >X / >=X
+        "lower_ugml",            # lower bound in µg/mL
+        "upper_ugml",            # upper bound in µg/mL
+        "species", "strain",
+        *MIN_LIST_COLS,          # joined from list_min.txt
+        "activity",              # 'active' | 'not active' | 'unknown'
+    ]
+
+
+def _normalized_chunks(header, batches, min_future):
+    """
+    Yield (row count, output columns) for each batch of columns, in input order.
+    min_future resolves to the min-list frame; it is awaited only once the first batch has
+    been read, so list_min.txt loads while the input is being parsed.
+    """
+    first = next(batches, None)
+    min_df = min_future.result()
+    if first is None:  # header only
+        return
+    first_row_num = 2  # CSV row number of the first row after the header
+    for columns in itertools.chain([first], batches):
+        n = len(columns[0])
+        yield n, _normalize_columns(header, columns, first_row_num, min_df)
+        first_row_num += n
+
+
+def _write_normalized(outfile, header, batches, min_future) -> int:
+    """Write the normalized batches to outfile (header first); returns the number of rows."""
+    n_rows = 0
+    with open_output_csv(outfile, buffering=Config.CSV_BUFFER_BYTES) as out_f:
+        writer = csv.writer(out_f)
+        writer.writerow(_output_fieldnames(header))
+        for n, columns in _normalized_chunks(header, batches, min_future):
+            writer.writerows(zip(*columns))
+            n_rows += n
+    return n_rows
+
+
+def _load_min_frame():
+    """load_min_map() as a DataFrame indexed by sequence for the NEW_SEQ join (None if empty)."""
+    min_map = load_min_map()
+    logger.info(f"Loaded {len(min_map)} entries from min list")
+    return pd.DataFrame.from_dict(min_map, orient="index", columns=MIN_LIST_COLS) if min_map else None
+
+
 def run(infile: str | None = None, outfile: str | None = None) -> None:
     """
     Read activity.csv, compute MW, split/normalize concentrations to µg/mL,
     classify activity, split species/strain, and write output CSV.
+    Rows are processed and written in batches of NORMALIZE_CHUNK_ROWS.
     """
     if infile is None:
         infile = Config.OUTPUT_ACTIVITY_CSV
@@ -285,75 +559,19 @@ def run(infile: str | None = None, outfile: str | None = None) -> None:
 
     logger.info(f"Starting activity normalization: {infile} -> {outfile}")
 
+    # Written to a temp file and moved into place, so a failed run leaves no partial output
+    tmp_file = f"{outfile}.tmp"
     try:
-        min_map = load_min_map()
-        logger.info(f"Loaded {len(min_map)} entries from min list")
-
-        with open(infile, encoding=Config.CSV_ENCODING) as f:
-            r = csv.DictReader(f)
-            fieldnames = list(r.fieldnames) + [
-                "MW_Da", "NEW_SEQ",
-                "conc_gt",               # 1 if original was >X / >=X
-                "lower_ugml",            # lower bound in µg/mL
-                "upper_ugml",            # upper bound in µg/mL
-                "species", "strain",
-                "curv_min", "npol_min", "ph_run", "npol_c0", "npol_c1", "npol_c2",
-                "activity",              # 'active' | 'not active' | 'unknown'
-            ]
-            rows = []
-            row_num = 1
-
-            for row in r:
-                row_num += 1
-                seq  = (row.get("SEQUENCE") or "").upper()
-                n    = row.get("N TERMINUS", "")
-                c    = row.get("C TERMINUS", "")
-                mw   = calc_mw(seq, n, c)
-                unit = row.get("unit", "")
-
-                lo, up, gt = parse_conc(row.get("concentration", ""), row_num)
-
-                row["MW_Da"] = f"{mw:.2f}"
-                z_prefix = get_z_prefix(n)
-                new_seq  = f"{z_prefix}{seq}{'01' if (c or '').upper() == 'AMD' else '00'}"
-                row["NEW_SEQ"] = new_seq
-
-                row["conc_gt"]             = gt
-
-                lo_ugml = to_ugml(lo, unit, mw, row_num)
-                up_ugml = to_ugml(up, unit, mw, row_num)
-                row["lower_ugml"] = lo_ugml
-                row["upper_ugml"] = up_ugml
-
-                sp, st = split_species(row.get("targetSpecies", ""))
-                row["species"] = sp
-                row["strain"]  = st
-
-                # Min-list join — exact NEW_SEQ match only.
-                # 00 (AMD) and 01 (non-AMD) are different simulations; never cross-assign.
-                curv_min, npol_min, ph_run, npol_c0, npol_c1, npol_c2 = ("", "", "", "", "", "")
-                if new_seq in min_map:
-                    curv_min, npol_min, ph_run, npol_c0, npol_c1, npol_c2 = min_map[new_seq]
-                row["curv_min"] = curv_min
-                row["npol_min"] = npol_min
-                row["ph_run"]   = ph_run
-                row["npol_c0"]  = npol_c0
-                row["npol_c1"]  = npol_c1
-                row["npol_c2"]  = npol_c2
-
-                # Activity classification
-                act = classify_activity(lo_ugml, up_ugml, gt)
-                row["activity"] = act
-                rows.append(row)
-
-        logger.info(f"Processed {row_num - 1} rows for normalization")
-        logger.info(f"Writing {len(rows)} rows to output")
-
-        with open(outfile, "w", encoding=Config.CSV_ENCODING, newline="") as f:
-            w = csv.DictWriter(f, fieldnames=fieldnames)
-            w.writeheader()
-            w.writerows(rows)
-
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            # list_min.txt is read in the background, overlapping the input read
+            min_future = ex.submit(_load_min_frame)
+            with open(infile, encoding=Config.CSV_ENCODING, buffering=Config.CSV_BUFFER_BYTES) as f:
+                r = csv.reader(f)
+                header = next(r, [])
+                n_rows = _write_normalized(tmp_file, header, _csv_batches(r, len(header)), min_future)
+        os.replace(tmp_file, outfile)
+
+        logger.info(f"Processed {n_rows} rows for normalization")
         logger.info(f"Successfully wrote normalized data to {outfile}")
 
     except FileNotFoundError:
@@ -365,6 +583,9 @@ def run(infile: str | None = None, outfile: str | None = None) -> None:
     except Exception as e:
         logger.error(f"Unexpected error in normalization: {e}")
         raise
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
 
 if __name__ == "__main__":
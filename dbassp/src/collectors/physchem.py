@@ -1,6 +1,8 @@
 # physchem.py
 import csv
 import logging
+import orjson
+import tempfile
 from src.core import common
 from src.core.config import Config
 from src.core.exceptions import APIError, FileProcessingError
@@ -17,82 +19,82 @@ def run():
             return
 
         logger.info(f"Processing {len(ids)} peptides for physicochemical data")
-        data = []
+        fetched = 0
         failed_peptides = []
+        # Net Charge is adjusted for C-terminus peptides (C12, C16, etc.); same for every row
+        nterminus = Config.get_nterminus()
+        adjust_charge = bool(nterminus and nterminus.startswith("C"))
+        # Single pass over each payload: its base columns and {property: value} are spooled
+        # to a JSONL temp file; property names are collected in first-seen order (skip "ID")
+        spool = tempfile.TemporaryFile("w+b")
+        props_seen = {}
         
-        for i, pid in enumerate(ids, start=1):
-            print(f"[{i}/{len(ids)}] Fetching physchem for peptide {pid} ...", end="", flush=True)
-            try:
-                d = common.fetch(pid)
-                data.append(d)
-                print(" ok")
-            except APIError as e:
-                logger.error(f"API error for peptide {pid}: {e}")
+        for pid, d in common.fetch_many(ids, label="physchem"):
+            if d is None:
                 failed_peptides.append(pid)
-                print(f" fail (API error)")
-            except Exception as e:
-                logger.error(f"Unexpected error for peptide {pid}: {e}")
-                failed_peptides.append(pid)
-                print(f" fail (unexpected error)")
+                continue
+            base = [
+                str(d.get("id", "")),                          # numeric peptide ID
+                (d.get("nTerminus") or {}).get("name", ""),    # only .name
+                d.get("sequence", ""),                          # original casing
+                (d.get("cTerminus") or {}).get("name", ""),    # only .name
+                d.get("complexity", ""),
+                d.get("name", ""),
+                (d.get("synthesisType") or {}).get("name", ""),
+            ]
+            values = {}
+            for p in d.get("physicoChemicalProperties") or []:
+                raw = p.get("name")
+                name = raw.strip() if raw else ""
+                if not name or name.upper() == "ID":
+                    continue
+                value = str(p.get("value", "")).strip()
+                
+                if adjust_charge and name == "Net Charge" and value:
+                    try:
+                        value = str(float(value) - 1.0)
+                    except ValueError:
+                        pass
+                
+                values[name] = value
+                props_seen.setdefault(name, None)
+            spool.write(orjson.dumps((base, values)))
+            spool.write(b"\n")
+            fetched += 1
 
         if failed_peptides:
             logger.warning(f"Failed to fetch {len(failed_peptides)} peptides: {failed_peptides}")
 
-        if not data:
+        if not fetched:
+            spool.close()
             logger.error("No data fetched; nothing to write.")
             return
 
-        logger.info(f"Successfully fetched data for {len(data)} peptides")
-        
-        # Collect property names preserving first-seen order, skip any property titled exactly "ID"
-        props, seen = [], set()
-        for d in data:
-            for p in d.get("physicoChemicalProperties") or []:
-                name = (p.get("name") or "").strip()
-                if not name or name.upper() == "ID":
-                    continue
-                if name not in seen:
-                    seen.add(name)
-                    props.append(name)
+        logger.info(f"Successfully fetched data for {fetched} peptides")
 
         # Final header: base peptide columns + dynamic physchem properties
+        props = list(props_seen)
         header = ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS", "complexity", "name", "synthesis_type"] + props
+        # Column position of each property, so rows can be built as plain lists
+        n_base = len(header) - len(props)
+        prop_idx = {name: i for i, name in enumerate(props, start=n_base)}
 
         try:
             # Write CSV, always one row per peptide (fill missing properties with empty string)
-            with open(Config.OUTPUT_PHYSCHEM_CSV, "w", newline="", encoding=Config.CSV_ENCODING) as f:
-                w = csv.DictWriter(f, fieldnames=header)
-                w.writeheader()
-                for d in data:
-                    row = {
-                        "Peptide ID": str(d.get("id", "")),                          # numeric peptide ID
-                        "N TERMINUS": (d.get("nTerminus") or {}).get("name", ""),    # only .name
-                        "SEQUENCE": d.get("sequence", ""),                            # original casing
-                        "C TERMINUS": (d.get("cTerminus") or {}).get("name", ""),    # only .name
-                        "complexity": d.get("complexity", ""),
-                        "name": d.get("name", ""),
-                        "synthesis_type": (d.get("synthesisType") or {}).get("name", ""),
-                    }
-                    # Map this peptide's properties
-                    values = {}
-                    for p in d.get("physicoChemicalProperties") or []:
-                        name = (p.get("name") or "").strip()
-                        if not name or name.upper() == "ID":
-                            continue
-                        value = str(p.get("value", "")).strip()
-                        
-                        # Adjust Net Charge for C-terminus peptides (C12, C16, etc.)
-                        nterminus = Config.get_nterminus()
-                        if name == "Net Charge" and nterminus and nterminus.startswith("C") and value:
-                            try:
-                                value = str(float(value) - 1.0)
-                            except ValueError:
-                                pass
-                        
-                        values[name] = value
-                    # Fill all columns consistently
-                    for name in props:
-                        row[name] = values.get(name, "")
+            with spool, common.open_output_csv(Config.OUTPUT_PHYSCHEM_CSV, buffering=Config.CSV_BUFFER_BYTES) as f:
+                w = csv.writer(f)
+                w.writerow(header)
+                # One row list is reused for every peptide; csv.writer serializes it immediately
+                row = [""] * len(header)
+                empty_props = [""] * len(props)
+                spool.seek(0)
+                for line in spool:
+                    base, values = orjson.loads(line)
+                    row[:n_base] = base
+                    row[n_base:] = empty_props
+                    # Map this peptide's properties into their columns
+                    for name, value in values.items():
+                        row[prop_idx[name]] = value
                     w.writerow(row)
                     
             logger.info(f"Successfully wrote physicochemical data to {Config.OUTPUT_PHYSCHEM_CSV}")
@@ -1,62 +1,97 @@
 # common.py
 # Shared functions and constants for DBAASP API interaction
 
+import atexit
 import csv
-import glob
+import functools
+import itertools
 import logging
+import os
+import re
+import threading
+import time
+import orjson
+import pandas as pd
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from src.core.config import Config
 from src.core.exceptions import APIError, FileProcessingError, DataValidationError
 
 logger = logging.getLogger("dbaasp_pipeline")
 
+# peptides_{Nterminus}.csv; the Nterminus ends at the next "_" or "."
+_PEPTIDES_FILE_RE = re.compile(r"^peptides_([^_.]*).*\.csv$")
+
 def auto_detect_nterminus() -> str:
     """
     Auto-detect Nterminus from available peptides_{Nterminus}.csv files.
     Returns the first Nterminus found, or raises an error if none found.
+    The result is memoized until files are added to or removed from data/input.
     """
+    input_dir = "data/input"
+    try:
+        dir_mtime = os.stat(input_dir).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = None
+    return _auto_detect_nterminus(input_dir, dir_mtime)
+
+@functools.lru_cache(maxsize=8)
+def _auto_detect_nterminus(input_dir: str, dir_mtime: int | None) -> str:
     logger.info("Auto-detecting Nterminus from available peptides files")
     
-    # Find all peptides_{Nterminus}.csv files
-    peptide_files = glob.glob("data/input/peptides_*.csv")
-    if not peptide_files:
+    # Single pass over data/input: keep the lexicographically smallest peptides_*.csv
+    count, first, first_match = 0, None, None
+    try:
+        with os.scandir(input_dir) as entries:
+            for entry in entries:
+                m = _PEPTIDES_FILE_RE.match(entry.name)
+                if m and entry.is_file():
+                    count += 1
+                    if first is None or entry.name < first:
+                        first, first_match = entry.name, m
+    except FileNotFoundError:
+        pass
+    
+    if first is None:
         raise FileProcessingError(
             "No peptides_{Nterminus}.csv files found. Please ensure you have files like peptides_C16.csv",
             filename="peptides_*.csv"
         )
     
-    # Sort files for consistent behavior
-    peptide_files.sort()
-    
-    # Extract Nterminus from first filename (data/input/peptides_C16.csv -> C16)
-    filename = peptide_files[0]
-    try:
-        basename = filename.split("/")[-1]
-        nterminus = basename.split("_")[1].split(".")[0]
-        
-        if not nterminus:
-            raise ValueError("Empty Nterminus")
-            
-        logger.info(f"Auto-detected Nterminus: {nterminus} from file: {filename}")
-        
-        # If multiple files exist, log them
-        if len(peptide_files) > 1:
-            logger.info(f"Found {len(peptide_files)} peptides files: {peptide_files}")
-            logger.info(f"Using first file: {filename}")
-            
-        return nterminus
-        
-    except (IndexError, ValueError) as e:
+    filename = os.path.join(input_dir, first)
+    nterminus = first_match.group(1)
+    if not nterminus:
         raise FileProcessingError(
             f"Invalid peptides filename format: {filename}. Expected format: data/input/peptides_{{Nterminus}}.csv",
             filename=filename
         )
+    
+    logger.info(f"Auto-detected Nterminus: {nterminus} from file: {filename}")
+    
+    # If multiple files exist, log them
+    if count > 1:
+        logger.info(f"Found {count} peptides files")
+        logger.info(f"Using first file: {filename}")
+        
+    return nterminus
 
 def detect_nterminus_from_csv(csv_file: str) -> str:
     """
     Read the first row of peptides to detect the Nterminus value.
     Returns the Nterminus value found, or raises an error if none found.
+    The result is memoized per (file, mtime).
     """
+    try:
+        mtime = os.stat(csv_file).st_mtime_ns
+    except FileNotFoundError:
+        raise FileProcessingError(f"Input file not found: {csv_file}", filename=csv_file)
+    return _detect_nterminus_from_csv(csv_file, mtime)
+
+@functools.lru_cache(maxsize=32)
+def _detect_nterminus_from_csv(csv_file: str, mtime: int) -> str:
     logger.info(f"Detecting Nterminus from {csv_file}")
     
     try:
@@ -87,6 +122,32 @@ def detect_nterminus_from_csv(csv_file: str) -> str:
     except csv.Error as e:
         raise FileProcessingError(f"CSV parsing error: {e}", filename=csv_file)
 
+# Integer after the last "_" (or the whole value): '51', 'DBAASPS_51'
+_ID_TAIL_RE = re.compile(r"(?:^|_)\s*([+-]?\d+)$")
+
+def _find_id_column(fieldnames):
+    """Return the 'Peptide ID' / 'ID' column name (case-insensitive), or None."""
+    for h in fieldnames or []:
+        if h.lower() in ("peptide id", "id"):
+            return h
+    return None
+
+def _load_ids_csv(csv_file: str, col: str):
+    """Row-by-row csv.DictReader fallback for files pandas cannot parse (e.g. ragged rows)."""
+    with open(csv_file, encoding=Config.CSV_ENCODING) as f:
+        ids = []
+        for row_num, row in enumerate(csv.DictReader(f), start=2):  # Start at 2 for header
+            raw = (row.get(col) or "").strip()
+            if not raw:
+                logger.warning(f"Empty ID in row {row_num}, skipping")
+                continue
+            m = _ID_TAIL_RE.search(raw)
+            if not m:
+                logger.warning(f"Invalid ID format '{raw}' in row {row_num}")
+                continue
+            ids.append(int(m.group(1)))
+        return ids
+
 def load_ids(csv_file: str | None = None):
     """
     Read peptide IDs from CSV file.
@@ -98,68 +159,114 @@ def load_ids(csv_file: str | None = None):
     
     logger.info(f"Loading peptide IDs from {csv_file}")
     
+    # index_col=False: ragged rows keep their first field as data, like csv.DictReader
+    read_opts = dict(dtype=str, na_filter=False, index_col=False, encoding=Config.CSV_ENCODING)
     try:
+        # Probe the header row, then read only the ID column
         with open(csv_file, encoding=Config.CSV_ENCODING) as f:
-            r = csv.DictReader(f)
-            col = None
-            for h in r.fieldnames or []:
-                if h.lower() in ("peptide id", "id"):
-                    col = h
-                    break
-            if not col:
-                raise DataValidationError(
-                    "No valid ID column found. Expected 'Peptide ID' or 'ID'",
-                    field="column_names"
-                )
-            
-            ids = []
-            for row_num, row in enumerate(r, start=2):  # Start at 2 for header
-                raw = (row.get(col) or "").strip()
-                if not raw:
-                    logger.warning(f"Empty ID in row {row_num}, skipping")
-                    continue
-                try:
-                    ids.append(int(raw.split("_")[-1]))
-                except ValueError as e:
-                    logger.warning(f"Invalid ID format '{raw}' in row {row_num}: {e}")
-                    continue
-                    
+            fieldnames = next(csv.reader(f), [])
+        col = _find_id_column(fieldnames)
+        if not col:
+            raise DataValidationError(
+                "No valid ID column found. Expected 'Peptide ID' or 'ID'",
+                field="column_names"
+            )
+        
+        try:
+            raw = pd.read_csv(csv_file, usecols=[col], **read_opts)[col].str.strip()
+        except pd.errors.ParserError as e:
+            logger.warning(f"Falling back to csv module for {csv_file}: {e}")
+            ids = _load_ids_csv(csv_file, col)
             logger.info(f"Successfully loaded {len(ids)} peptide IDs")
             return ids
+        
+        # 'DBAASPS_51' -> '51'; anything that is not an integer is reported and skipped
+        tail = raw.str.extract(_ID_TAIL_RE, expand=False)
+        valid = tail.notna()
+        for i in raw.index[raw.eq("")]:
+            logger.warning(f"Empty ID in row {i + 2}, skipping")  # +2: header row, 1-based
+        for i in raw.index[~valid & raw.ne("")]:
+            logger.warning(f"Invalid ID format '{raw[i]}' in row {i + 2}")
+        ids = tail[valid].astype("int64").tolist()
+                
+        logger.info(f"Successfully loaded {len(ids)} peptide IDs")
+        return ids
             
     except FileNotFoundError:
         raise FileProcessingError(f"Input file not found: {csv_file}", filename=csv_file)
-    except csv.Error as e:
+    except (csv.Error, pd.errors.ParserError, UnicodeDecodeError) as e:
         raise FileProcessingError(f"CSV parsing error: {e}", filename=csv_file)
 
-import json
-import os
+def open_output_csv(path: str, buffering: int = -1):
+    """
+    Open a CSV file for writing in Config.CSV_ENCODING (newline="" for the csv module).
+    For utf-8-sig the BOM is written once and the rest goes through Python's built-in
+    utf-8 encoder, which is faster than the utf-8-sig codec; the bytes are identical.
+    """
+    if Config.CSV_ENCODING.lower().replace("_", "-") != "utf-8-sig":
+        return open(path, "w", newline="", encoding=Config.CSV_ENCODING, buffering=buffering)
+    f = open(path, "w", newline="", encoding="utf-8", buffering=buffering)
+    f.write("\ufeff")
+    return f
+
+def _make_session() -> requests.Session:
+    """
+    Shared session: keeps TCP/TLS connections alive across peptides and retries
+    connection errors, timeouts and 429/5xx with jittered exponential backoff.
+    """
+    session = requests.Session()
+    session.headers.update(Config.API_HEADERS)
+    retry = Retry(
+        total=Config.API_MAX_RETRIES,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,  # randomize waits so worker threads don't retry in lockstep
+        backoff_max=30,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,  # 429/503 wait as long as the server asks
+        raise_on_status=False,  # hand the last response to raise_for_status()
+    )
+    pool_size = max(Config.MAX_WORKERS, 10)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_SESSION = _make_session()
+atexit.register(_SESSION.close)
 
 def fetch(pid: int):
     """Fetch a single peptide JSON from DBAASP API with disk caching."""
-    cache_dir = "data/cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    cache_file = os.path.join(cache_dir, f"{pid}.json")
+    cache_file = os.path.join(Config.CACHE_DIR, f"{pid}.json")
     
-    if os.path.exists(cache_file):
-        logger.debug(f"Loading peptide {pid} from cache")
-        with open(cache_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+    try:
+        if Config.CACHE_MAX_AGE_DAYS and time.time() - os.path.getmtime(cache_file) > Config.CACHE_MAX_AGE_DAYS * 86400:
+            logger.debug(f"Cache entry for peptide {pid} expired")
+        else:
+            with open(cache_file, "rb") as f:
+                data = orjson.loads(f.read())
+            logger.debug(f"Loaded peptide {pid} from cache")
+            return data
+    except FileNotFoundError:
+        pass
+    except orjson.JSONDecodeError:
+        logger.warning(f"Corrupt cache entry for peptide {pid}, fetching again")
 
     logger.debug(f"Fetching peptide {pid} from API")
     
     try:
-        resp = requests.get(
+        resp = _SESSION.get(
             Config.API_URL.format(id=pid), 
-            headers=Config.API_HEADERS, 
             timeout=Config.API_TIMEOUT
         )
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
         
-        # Save to cache
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        # Save to cache (write then rename, so concurrent readers never see a partial file)
+        os.makedirs(Config.CACHE_DIR, exist_ok=True)
+        tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp_file, cache_file)
             
         logger.debug(f"Successfully fetched and cached peptide {pid}")
         return data
@@ -174,5 +281,54 @@ def fetch(pid: int):
             peptide_id=pid, 
             status_code=e.response.status_code
         )
-    except requests.exceptions.JSONDecodeError:
-        raise APIError(f"Invalid JSON response for peptide {pid}", peptide_id=pid)
\ No newline at end of file
+    except orjson.JSONDecodeError:
+        raise APIError(f"Invalid JSON response for peptide {pid}", peptide_id=pid)
+
+def _fetch_or_none(pid: int):
+    """Wrapper around fetch() for worker threads: returns (data, failure reason)."""
+    try:
+        return fetch(pid), None
+    except APIError as e:
+        logger.error(f"API error for peptide {pid}: {e}")
+        return None, "API error"
+    except Exception as e:
+        logger.error(f"Unexpected error for peptide {pid}: {e}")
+        return None, "unexpected error"
+
+PROGRESS_EVERY = 100  # peptides per progress line in fetch_many
+FETCH_WINDOW_PER_WORKER = 4  # read-ahead of fetch_many, in peptides per worker
+
+def fetch_many(ids: list[int], label: str = "data"):
+    """
+    Fetch many peptides concurrently using a pool of Config.MAX_WORKERS threads.
+    Yields (pid, data) in the order of ids as soon as each result is ready;
+    data is None if the fetch failed (the error is logged). Fetching runs at most
+    FETCH_WINDOW_PER_WORKER peptides per worker ahead of the consumer.
+    """
+    workers = max(1, min(Config.MAX_WORKERS, len(ids)))
+    logger.info(f"Fetching {len(ids)} peptides with {workers} workers")
+
+    n, failed = len(ids), 0
+    # At most `window` fetches are queued or finished-but-unconsumed at any time,
+    # so a slow consumer holds back the workers instead of piling up payloads
+    window = workers * FETCH_WINDOW_PER_WORKER
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        todo = iter(ids)
+        for pid in itertools.islice(todo, window):
+            pending.append((pid, ex.submit(_fetch_or_none, pid)))
+        i = 0
+        while pending:
+            pid, future = pending.popleft()
+            data, reason = future.result()
+            next_pid = next(todo, None)
+            if next_pid is not None:
+                pending.append((next_pid, ex.submit(_fetch_or_none, next_pid)))
+            i += 1
+            if reason:
+                failed += 1
+                print(f"[{i}/{n}] Fetching {label} for peptide {pid} ... fail ({reason})")
+            # Progress is reported in batches rather than once per peptide
+            if i % PROGRESS_EVERY == 0 or i == n:
+                print(f"[{i}/{n}] Fetched {label} ({failed} failed)")
+            yield pid, data
@@ -10,6 +10,8 @@ class Config:
     # API Configuration
     API_URL = os.getenv("DBAASP_API_URL", "https://dbaasp.org/peptides/{id}")
     API_TIMEOUT = int(os.getenv("DBAASP_TIMEOUT", "20"))
+    MAX_WORKERS = int(os.getenv("DBAASP_MAX_WORKERS", "16"))  # concurrent API requests
+    API_MAX_RETRIES = int(os.getenv("DBAASP_MAX_RETRIES", "5"))  # retries on connection errors / 429 / 5xx
     API_HEADERS = {
         "User-Agent": os.getenv("USER_AGENT", "Mozilla/5.0"),
         "Accept": "application/json"
@@ -25,12 +27,19 @@ class Config:
     OUTPUT_INTRINSIC_CSV = os.getenv("OUTPUT_INTRINSIC_CSV", "data/output/intrinsic_properties.csv")
     MIN_LIST_FILE = os.getenv("MIN_LIST_FILE", "data/input/list_min.txt")
     
+    # Peptide JSON cache: one {id}.json per peptide, reused across runs
+    CACHE_DIR = os.getenv("DBAASP_CACHE_DIR", "data/cache")
+    CACHE_MAX_AGE_DAYS = float(os.getenv("DBAASP_CACHE_MAX_AGE_DAYS", "0"))  # 0 = never expire
+    
     # Current Nterminus (set dynamically during pipeline execution)
     _current_nterminus = None
     
     # File Encoding
     CSV_ENCODING = "utf-8-sig"
     
+    # Buffer size for large CSV reads and writes (fewer syscalls than the 8 KiB default)
+    CSV_BUFFER_BYTES = int(os.getenv("DBAASP_CSV_BUFFER_BYTES", str(1 << 20)))
+    
     # Molecular Weight Constants (Da)
     AA_MASS = {
         "A": 71.08, "R": 156.19, "N": 114.10, "D": 115.09, "C": 103.15,
@@ -85,7 +94,8 @@ class Config:
         """Check if required input files exist."""
         logger = logging.getLogger("dbaasp_pipeline")
         required_files = [cls.INPUT_PEPTIDES_CSV]
-        missing = [f for f in required_files if not os.path.exists(f)]
+        # One stat() per file; a directory with the expected name does not count
+        missing = [f for f in required_files if not os.path.isfile(f)]
         if missing:
             logger.error(f"Missing required files: {missing}")
             return False
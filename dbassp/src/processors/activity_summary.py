@@ -4,6 +4,7 @@
 
 import csv
 import logging
+from src.core.common import open_output_csv
 from src.core.config import Config
 from src.core.exceptions import FileProcessingError
 
@@ -56,7 +57,7 @@ def run(infile: str | None = None, outfile: str | None = None) -> None:
                     continue
                 rows.append({col: row.get(col, "") for col in SUMMARY_COLS})
 
-        with open(outfile, "w", encoding=Config.CSV_ENCODING, newline="") as f:
+        with open_output_csv(outfile) as f:
             writer = csv.DictWriter(f, fieldnames=SUMMARY_COLS)
             writer.writeheader()
             writer.writerows(rows)
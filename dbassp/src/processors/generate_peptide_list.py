@@ -1,9 +1,30 @@
 import csv
+import functools
+import os
 import re
 import logging
+import warnings
+import pandas as pd
 
 logger = logging.getLogger("dbaasp_pipeline")
 
+_CARBON_RE = re.compile(r'C(\d+)')
+
+# total_sequence suffix by upper-cased C terminus; any other terminus gets "01"
+_C_TERMINUS_SUFFIX = {"AMD": "00"}
+
+# Output write buffer (the default of Config.CSV_BUFFER_BYTES; this script runs standalone)
+_OUTPUT_BUFFER_BYTES = 1 << 20
+
+def _open_output_csv(path: str):
+    """
+    Open path for csv writing in utf-8-sig: the BOM is written once and the rest goes
+    through the plain utf-8 codec, which is faster; the bytes are identical.
+    """
+    f = open(path, 'w', encoding='utf-8', newline='', buffering=_OUTPUT_BUFFER_BYTES)
+    f.write('\ufeff')
+    return f
+
 def get_z_count_from_nterm(n_terminus: str) -> int:
     """
     Calculate the number of Z's based on N-terminus.
@@ -15,15 +36,97 @@ def get_z_count_from_nterm(n_terminus: str) -> int:
     Returns:
         Number of Z's needed
     """
-    match = re.search(r'C(\d+)', n_terminus.upper())
+    z_count, warning = _z_count(n_terminus)
+    if warning:
+        logger.warning(warning)  # logged on every call, not only the first
+    return z_count
+
+@functools.lru_cache(maxsize=32)
+def _z_count(n_terminus: str) -> tuple[int, str | None]:
+    """(Z count, warning message or None) for get_z_count_from_nterm."""
+    match = _CARBON_RE.search(n_terminus.upper())
     if match:
         num = int(match.group(1))
         z_count = num // 4
         if z_count > 0:
-            return z_count
+            return z_count, None
+    
+    return 4, f"Could not parse N-terminus '{n_terminus}', defaulting to 4 Z's (C16)"
+
+def _peptide_list_frame(input_file: str, z_prefix: str):
+    """
+    Build the peptide list with pandas: (output DataFrame, sequences with X, unique
+    valid sequences), or None when the file needs the row-by-row csv path (ragged rows,
+    header only, repeated or clashing header names), so the output stays what
+    csv.DictReader/DictWriter would produce.
+    dtype=object keeps Python str semantics for upper()/strip().
+    """
+    try:
+        with warnings.catch_warnings():
+            # Rows longer than the header only warn (and are truncated) with index_col=False
+            warnings.simplefilter("error", pd.errors.ParserWarning)
+            df = pd.read_csv(input_file, dtype=object, na_filter=False, index_col=False, encoding='utf-8-sig')
+    except (pd.errors.ParserError, pd.errors.ParserWarning, pd.errors.EmptyDataError) as e:
+        logger.warning(f"Falling back to csv module for {input_file}: {e}")
+        return None
+    if df.empty:  # header only: nothing to vectorize
+        return None
+    with open(input_file, 'r', encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f), [])
+    if (list(df.columns) != header or {"total_sequence", "filtered_sequence"} & set(header)
+            or df.isna().to_numpy().any()):
+        logger.warning(f"Falling back to csv module for {input_file}: irregular rows or header")
+        return None
+
+    sequence = df["SEQUENCE"].str.upper()
+    suffix = df["C TERMINUS"].str.strip().str.upper().map(_C_TERMINUS_SUFFIX).fillna("01")
+    total_sequence = z_prefix + sequence + suffix
+    has_x = total_sequence.str.contains("X", regex=False)
+    # First occurrence of each sequence without X; a duplicate's earlier copy has no X either
+    is_valid = ~has_x & ~total_sequence.duplicated()
+
+    df["total_sequence"] = total_sequence
+    df["filtered_sequence"] = total_sequence.where(is_valid, "")
+    return df, int(has_x.sum()), int(is_valid.sum())
+
+def _write_peptide_list_rows(input_file: str, output_file: str, z_prefix: str):
+    """
+    Row-by-row csv fallback for _peptide_list_frame: each row is written as soon as it is
+    read. Returns (total sequences, sequences with X, unique valid sequences).
+    """
+    seen_sequences = set()
+    total_sequences = 0
+    sequences_with_x = 0
+    
+    with open(input_file, 'r', encoding='utf-8-sig', newline='') as infile:
+        reader = csv.DictReader(infile)
+        fieldnames = list(reader.fieldnames) + ["total_sequence", "filtered_sequence"]
+        
+        with _open_output_csv(output_file) as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            
+            suffix_for = _C_TERMINUS_SUFFIX.get
+            for row in reader:
+                sequence = str(row["SEQUENCE"]).upper()
+                suffix = suffix_for(str(row["C TERMINUS"]).strip().upper(), "01")
+                total_sequence = f"{z_prefix}{sequence}{suffix}"
+                row["total_sequence"] = total_sequence
+                
+                if "X" in total_sequence:
+                    sequences_with_x += 1
+                    is_valid = False
+                else:
+                    # The set grows only for a first occurrence: one hash instead of in + add
+                    n_seen = len(seen_sequences)
+                    seen_sequences.add(total_sequence)
+                    is_valid = len(seen_sequences) > n_seen
+                
+                row["filtered_sequence"] = total_sequence if is_valid else ""
+                writer.writerow(row)
+                total_sequences += 1
     
-    logger.warning(f"Could not parse N-terminus '{n_terminus}', defaulting to 4 Z's (C16)")
-    return 4
+    return total_sequences, sequences_with_x, len(seen_sequences)
 
 def generate_peptide_list(n_terminus):
     """
@@ -38,44 +141,25 @@ def generate_peptide_list(n_terminus):
     
     print(f"Processing {n_terminus}: Using {z_count} Z's ({z_prefix})")
     
-    rows = []
-    seen_sequences = set()
+    # Both paths write to a temp file that is moved into place, so a failed run
+    # leaves no partial output
+    tmp_file = f"{output_file}.tmp"
     
     try:
-        with open(input_file, 'r', encoding='utf-8-sig', newline='') as infile:
-            reader = csv.DictReader(infile)
-            fieldnames = list(reader.fieldnames) + ["total_sequence", "filtered_sequence"]
-            
-            for row in reader:
-                sequence = str(row["SEQUENCE"]).upper()
-                c_terminus = str(row["C TERMINUS"]).strip()
-                
-                if c_terminus.upper() == "AMD":
-                    suffix = "00"
-                else:
-                    suffix = "01"
-                    
-                total_sequence = f"{z_prefix}{sequence}{suffix}"
-                row["total_sequence"] = total_sequence
-                
-                is_valid = "X" not in total_sequence and total_sequence not in seen_sequences
-                
-                if is_valid:
-                    row["filtered_sequence"] = total_sequence
-                    seen_sequences.add(total_sequence)
-                else:
-                    row["filtered_sequence"] = ""
-                
-                rows.append(row)
-        
-        with open(output_file, 'w', encoding='utf-8-sig', newline='') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-        
-        total_sequences = len(rows)
-        valid_sequences = sum(1 for row in rows if row["filtered_sequence"])
-        sequences_with_x = sum(1 for row in rows if "X" in row["total_sequence"])
+        result = _peptide_list_frame(input_file, z_prefix)
+        if result is not None:
+            df, sequences_with_x, valid_sequences = result
+            total_sequences = len(df)
+            with _open_output_csv(tmp_file) as outfile:
+                # Positional rows from the column lists; header names are unique on this path
+                writer = csv.writer(outfile)
+                writer.writerow(df.columns)
+                writer.writerows(zip(*(df[c].tolist() for c in df.columns)))
+        else:
+            total_sequences, sequences_with_x, valid_sequences = _write_peptide_list_rows(
+                input_file, tmp_file, z_prefix
+            )
+        os.replace(tmp_file, output_file)
         
         print(f"Archivo generado: {output_file}")
         print(f"Total de secuencias originales: {total_sequences}")
@@ -87,6 +171,9 @@ def generate_peptide_list(n_terminus):
         print(f"Error: No se encontró el archivo {input_file}")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
 if __name__ == "__main__":
     import sys
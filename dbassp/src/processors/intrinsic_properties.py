@@ -3,14 +3,49 @@
 # representing the intrinsic molecular properties of peptides
 
 import csv
-import re
+import functools
 import logging
+import pandas as pd
+from src.core.common import open_output_csv
 from src.core.config import Config
 from src.core.exceptions import FileProcessingError
-from src.collectors.normalize_activity import load_min_map, get_z_prefix
+from src.collectors.normalize_activity import calc_mw_batch, load_min_map, get_z_prefix, MIN_LIST_COLS
 
 logger = logging.getLogger("dbaasp_pipeline")
 
+def _read_columns(path: str):
+    """
+    (header, DataFrame of strings) for a CSV, or (None, None) if it is empty. Rows are read
+    as csv.DictReader reads them: blank lines skipped, short rows padded with "", extra
+    fields dropped, and a repeated header name maps to its last column.
+    """
+    with open(path, encoding=Config.CSV_ENCODING) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return None, None
+        width = len(header)
+        columns = list(zip(*((row + [""] * width)[:width] for row in reader if row))) or [()] * width
+    return header, pd.DataFrame({name: list(col) for name, col in zip(header, columns)}, dtype=object)
+
+@functools.lru_cache(maxsize=4096)
+def _total_charge(net_charge: str, acylated: bool, amidated: bool) -> str:
+    """
+    Net Charge with the terminus corrections, formatted to 2 decimals ("" if it is not a
+    number). Parsed with float(), so "nan"/"inf" carry through as such.
+    """
+    if net_charge == "":
+        return ""
+    try:
+        tc = float(net_charge)
+    except ValueError:
+        return ""
+    if acylated:
+        tc -= 1.0
+    if amidated:
+        tc += 1.0
+    return f"{tc:.2f}"
+
 def create_intrinsic_csv(
     physchem_file: str | None = None,
     lipophilicity_file: str | None = None,
@@ -41,24 +76,21 @@ def create_intrinsic_csv(
     logger.info(f"Creating intrinsic properties CSV: {physchem_file} + {lipophilicity_file} -> {output_file}")
     
     try:
-        # Step 1: Load lipophilicity data by Peptide ID
-        lipophilicity_data = {}
+        # Step 1: Load lipophilicity data, one row per Peptide ID
+        lipo_df = None
         lipophilicity_headers = []
         
         try:
-            with open(lipophilicity_file, encoding=Config.CSV_ENCODING) as f:
-                reader = csv.DictReader(f)
-                if reader.fieldnames is not None:
-                    # Exclude basic peptide info, keep only lipophilicity properties
-                    lipophilicity_headers = [h for h in reader.fieldnames 
-                                            if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS"]]
-                    
-                    for row in reader:
-                        peptide_id = row["Peptide ID"]
-                        lipophilicity_props = {h: row.get(h, "") for h in lipophilicity_headers}
-                        lipophilicity_data[peptide_id] = lipophilicity_props
+            lipo_fields, lipo_cols = _read_columns(lipophilicity_file)
+            if lipo_fields is not None:
+                # Exclude basic peptide info, keep only lipophilicity properties
+                lipophilicity_headers = [h for h in lipo_fields 
+                                        if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS"]]
+                lipo_df = lipo_cols.set_index("Peptide ID")[list(dict.fromkeys(lipophilicity_headers))]
+                # Later rows win on duplicate IDs, as with a plain dict
+                lipo_df = lipo_df[~lipo_df.index.duplicated(keep="last")]
             
-            logger.info(f"Loaded lipophilicity data for {len(lipophilicity_data)} peptides")
+            logger.info(f"Loaded lipophilicity data for {0 if lipo_df is None else len(lipo_df)} peptides")
             logger.info(f"Lipophilicity properties: {lipophilicity_headers}")
         except FileNotFoundError:
             logger.warning(f"Lipophilicity file not found: {lipophilicity_file}")
@@ -71,7 +103,6 @@ def create_intrinsic_csv(
         # load_min_map() returns {NEW_SEQ -> (curv_min, npol_min, ph_run, npol_c0, npol_c1, npol_c2)}
         # curv_min=0 is stored as the string "0" and is handled correctly.
         min_list_map = load_min_map(min_list_file)
-        MIN_LIST_COLS = ["curv_min", "npol_min", "ph_run", "npol_c0", "npol_c1", "npol_c2"]
         if min_list_map:
             min_list_headers = MIN_LIST_COLS
             logger.info(f"Loaded min list data for {len(min_list_map)} sequences")
@@ -81,112 +112,84 @@ def create_intrinsic_csv(
             logger.warning(f"Min list file not found or empty: {min_list_file}")
             logger.warning("Continuing without min list data")
         
-        # Step 3: Process physchem data and merge with lipophilicity and min list
-        intrinsic_rows = []
+        # Step 3: Load physchem data, add derived columns and join lipophilicity and min list
+        physchem_headers, phys = _read_columns(physchem_file)
+        if physchem_headers is None:
+            raise FileProcessingError(f"No headers found in {physchem_file}", filename=physchem_file)
         
-        with open(physchem_file, encoding=Config.CSV_ENCODING) as f:
-            reader = csv.DictReader(f)
-            
-            if reader.fieldnames is None:
-                raise FileProcessingError(f"No headers found in {physchem_file}", filename=physchem_file)
-            
-            # Create intrinsic header: physchem columns + lipophilicity columns + min list columns
-            physchem_headers = list(reader.fieldnames)
-            new_cols = ["long_tail", "molecular_weight", "total_charge"]
-            intrinsic_headers = physchem_headers + new_cols + lipophilicity_headers + min_list_headers
-            
-            row_count = 0
-            lipo_matched = 0
-            min_matched = 0
-            
-            for row in reader:
-                row_count += 1
-                peptide_id = row["Peptide ID"]
-                sequence   = (row.get("SEQUENCE") or "").upper()
-                n_term     = row.get("N TERMINUS", "")
-                c_term     = row.get("C TERMINUS", "")
+        # Create intrinsic header: physchem columns + lipophilicity columns + min list columns
+        new_cols = ["long_tail", "molecular_weight", "total_charge"]
+        intrinsic_headers = physchem_headers + new_cols + lipophilicity_headers + min_list_headers
+        
+        blank = pd.Series("", index=phys.index, dtype=object)
+        sequence = phys.get("SEQUENCE", blank).str.upper()
+        n_term   = phys.get("N TERMINUS", blank)
+        c_term   = phys.get("C TERMINUS", blank)
+        is_amd   = c_term.str.upper().eq("AMD")
 
-                # Build the same NEW_SEQ key used by normalize_activity
-                z_prefix = get_z_prefix(n_term)
-                new_seq  = f"{z_prefix}{sequence}{'01' if (c_term or '').upper() == 'AMD' else '00'}"
+        # Build the same NEW_SEQ key used by normalize_activity
+        new_seq = pd.Index(
+            [f"{get_z_prefix(nt)}{seq}{'01' if amd else '00'}" for nt, seq, amd in zip(n_term, sequence, is_amd)],
+            dtype=object,
+        )
 
-                # ─── New Calculations: long_tail, molecular_weight, total_charge ───
-                
-                # 1. long_tail: Extracted from N TERMINUS (e.g., C12 -> 12)
-                long_tail = ""
-                if n_term:
-                    match = re.search(r'C(\d+)', n_term.upper())
-                    if match:
-                        long_tail = match.group(1)
-                
-                # 2. molecular_weight: sequence + N-term fatty acid + C-term modification
-                # We re-calculate here for consistency (matching normalize_activity.calc_mw)
-                mw = sum(Config.AA_MASS.get(a.upper(), 110.0) for a in (sequence or "")) + Config.H2O_MASS
-                if n_term and n_term.upper() in Config.NTERM_MASS:
-                    mw += Config.NTERM_MASS[n_term.upper()]
-                if c_term and c_term.upper() in Config.CTERM_MASS:
-                    mw += Config.CTERM_MASS[c_term.upper()]
-                
-                # 3. total_charge: Net Charge + terminus corrections
-                # DBAASP Net Charge assumes free N(+1)/C(-1)
-                # Acylated N-term (C4-C20) -> loses +1 (apply -1)
-                # Amidated C-term (AMD) -> loses -1 (apply +1)
-                raw_net_charge = row.get("Net Charge", "")
-                total_charge = ""
-                if raw_net_charge != "":
-                    try:
-                        tc = float(raw_net_charge)
-                        if long_tail: # If we have a fatty acid chain, it's acylated
-                            tc -= 1.0
-                        if (c_term or "").upper() == "AMD":
-                            tc += 1.0
-                        total_charge = f"{tc:.2f}"
-                    except ValueError:
-                        total_charge = ""
+        # Each step below sets whole columns by name, so (as with dict.update on a row) a later
+        # source overrides an earlier column of the same name: derived columns override physchem,
+        # lipophilicity overrides both, min list overrides all
+        intrinsic = phys.copy()
 
-                # Create intrinsic row starting with physchem data
-                intrinsic_row = dict(row)
-                intrinsic_row["long_tail"] = long_tail
-                intrinsic_row["molecular_weight"] = f"{mw:.2f}"
-                intrinsic_row["total_charge"] = total_charge
+        # ─── New Calculations: long_tail, molecular_weight, total_charge ───
+        
+        # 1. long_tail: Extracted from N TERMINUS (e.g., C12 -> 12)
+        long_tail = n_term.str.upper().str.extract(r'C(\d+)', expand=False).fillna("")
+        intrinsic["long_tail"] = long_tail
+        
+        # 2. molecular_weight: sequence + N-term fatty acid + C-term modification
+        # (same calculation as normalize_activity.calc_mw)
+        mw = calc_mw_batch(sequence.tolist(), n_term.tolist(), c_term.tolist())
+        intrinsic["molecular_weight"] = [f"{v:.2f}" for v in mw]
+        
+        # 3. total_charge: Net Charge + terminus corrections
+        # DBAASP Net Charge assumes free N(+1)/C(-1)
+        # Acylated N-term (C4-C20) -> loses +1 (apply -1)
+        # Amidated C-term (AMD) -> loses -1 (apply +1)
+        intrinsic["total_charge"] = list(map(
+            _total_charge, phys.get("Net Charge", blank), long_tail.ne(""), is_amd
+        ))
 
-                # Add lipophilicity properties if available
-                if peptide_id in lipophilicity_data:
-                    intrinsic_row.update(lipophilicity_data[peptide_id])
-                    lipo_matched += 1
-                else:
-                    for header in lipophilicity_headers:
-                        intrinsic_row[header] = ""
+        # Add lipophilicity properties if available; peptides without data get ""
+        peptide_ids = phys["Peptide ID"] if "Peptide ID" in phys else blank
+        if lipo_df is not None:
+            lipo_matched = int(peptide_ids.isin(lipo_df.index).sum())
+            lipo_rows = lipo_df.reindex(peptide_ids.to_numpy()).fillna("")
+            for header in lipo_rows.columns:
+                intrinsic[header] = lipo_rows[header].to_numpy()
+        else:
+            lipo_matched = 0
 
-                # Add min list properties — exact NEW_SEQ match only.
-                # 00 (AMD) and 01 (non-AMD) are different simulations; never cross-assign.
-                if new_seq in min_list_map:
-                    curv, npol, ph, nc0, nc1, nc2 = min_list_map[new_seq]
-                    intrinsic_row["curv_min"] = curv
-                    intrinsic_row["npol_min"] = npol
-                    intrinsic_row["ph_run"]   = ph
-                    intrinsic_row["npol_c0"]  = nc0
-                    intrinsic_row["npol_c1"]  = nc1
-                    intrinsic_row["npol_c2"]  = nc2
-                    min_matched += 1
-                else:
-                    for header in min_list_headers:
-                        intrinsic_row[header] = ""
+        # Add min list properties — exact NEW_SEQ match only.
+        # 00 (AMD) and 01 (non-AMD) are different simulations; never cross-assign.
+        if min_list_map:
+            min_df = pd.DataFrame.from_dict(min_list_map, orient="index", columns=MIN_LIST_COLS)
+            min_matched = int(new_seq.isin(min_df.index).sum())
+            min_rows = min_df.reindex(new_seq).fillna("")
+            for header in MIN_LIST_COLS:
+                intrinsic[header] = min_rows[header].to_numpy()
+        else:
+            min_matched = 0
 
-                intrinsic_rows.append(intrinsic_row)
-        
-        logger.info(f"Processed {row_count} peptides")
+        logger.info(f"Processed {len(intrinsic)} peptides")
         logger.info(f"Matched {lipo_matched} with lipophilicity data")
         logger.info(f"Matched {min_matched} with min list data")
         
-        # Step 4: Write intrinsic properties CSV
-        with open(output_file, "w", encoding=Config.CSV_ENCODING, newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=intrinsic_headers)
-            writer.writeheader()
-            writer.writerows(intrinsic_rows)
+        # Step 4: Write intrinsic properties CSV (a repeated header name repeats its value)
+        with open_output_csv(output_file, buffering=Config.CSV_BUFFER_BYTES) as f:
+            writer = csv.writer(f)
+            writer.writerow(intrinsic_headers)
+            writer.writerows(zip(*(intrinsic[h].tolist() for h in intrinsic_headers)))
         
         logger.info(f"Successfully created intrinsic properties CSV: {output_file}")
-        logger.info(f"Final CSV contains {len(intrinsic_rows)} rows and {len(intrinsic_headers)} columns")
+        logger.info(f"Final CSV contains {len(intrinsic)} rows and {len(intrinsic_headers)} columns")
         
         # Log summary of what's included
         logger.info("Intrinsic properties CSV includes:")
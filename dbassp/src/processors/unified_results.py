@@ -2,12 +2,106 @@
 # Combines physchem, activity, and normalized data into a single CSV
 
 import csv
+import itertools
 import logging
+import os
+import numpy as np
+import pandas as pd
+from src.core.common import open_output_csv
 from src.core.config import Config
 from src.core.exceptions import FileProcessingError
 
 logger = logging.getLogger("dbaasp_pipeline")
 
+# Activity rows read, joined and written per batch; bounds the activity data held in memory
+UNIFIED_BATCH_ROWS = 10_000
+
+def _read_header(path: str):
+    """Header row of a CSV file, or None if the file is empty."""
+    with open(path, encoding=Config.CSV_ENCODING) as f:
+        return next(csv.reader(f), None)
+
+def _column_batches(path: str, width: int):
+    """
+    The data rows of path (after the header) in batches of at most UNIFIED_BATCH_ROWS,
+    each as width lists of strings. Blank lines are skipped and short rows padded with
+    None, as csv.DictReader does.
+    """
+    if not width:
+        return
+    with open(path, encoding=Config.CSV_ENCODING, buffering=Config.CSV_BUFFER_BYTES) as f:
+        r = csv.reader(f)
+        next(r, None)
+        rows = ((row + [None] * width)[:width] for row in r if row)
+        while chunk := list(itertools.islice(rows, UNIFIED_BATCH_ROWS)):
+            yield [list(c) for c in zip(*chunk)]
+
+def _read_columns(path: str):
+    """
+    Read a whole CSV into (header, {column name: list of values}), or (None, {}) if it is
+    empty; for the physchem and lipophilicity lookup tables. A repeated name maps to its
+    last column, as in a csv.DictReader row.
+    """
+    header = _read_header(path)
+    if header is None:
+        return None, {}
+    values = [[] for _ in header]
+    for batch in _column_batches(path, len(header)):
+        for column, part in zip(values, batch):
+            column.extend(part)
+    return header, dict(zip(header, values))
+
+def _last_positions(ids) -> dict:
+    """{Peptide ID: row index}; a repeated ID keeps its last row, as a dict keyed by ID would."""
+    return {peptide_id: i for i, peptide_id in enumerate(ids)}
+
+def _lookup_table(positions: dict):
+    """positions as (pd.Index of Peptide IDs, their row indices) for _lookup; None if empty."""
+    if not positions:
+        return None
+    return pd.Index(list(positions)), np.fromiter(positions.values(), dtype=np.intp, count=len(positions))
+
+def _lookup(table, ids) -> np.ndarray:
+    """Row index in a _lookup_table for each of ids, -1 where missing (a hashed join in pandas)."""
+    if table is None:
+        return np.full(len(ids), -1, dtype=np.intp)
+    index, rows = table
+    found = index.get_indexer(ids)
+    return np.where(found >= 0, rows[found], -1)
+
+def _with_missing(column) -> np.ndarray:
+    """column as an object array with a trailing "", which row index -1 (no data) picks."""
+    return np.array(column + [""], dtype=object)
+
+def _write_unified(path: str, activity_headers, unified_headers, id_col, physchem, lipophilicity, batches):
+    """
+    Write the unified CSV to path from batches of activity columns. physchem and
+    lipophilicity are (lookup table, [(header, column with missing sentinel)]).
+    Returns (rows, rows matched with physchem data, {missing Peptide ID: None}, missing rows).
+    """
+    (physchem_table, physchem_joined), (lipophilicity_table, lipophilicity_joined) = physchem, lipophilicity
+    row_count = missing_rows = 0
+    missing_ids = {}
+    with open_output_csv(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(unified_headers)
+        for values in batches:
+            batch = dict(zip(activity_headers, values))
+            peptide_ids = values[id_col]
+            row_count += len(peptide_ids)
+            # Row of each activity row's peptide in the physchem table (-1 if missing)
+            physchem_rows = _lookup(physchem_table, peptide_ids)
+            missing = np.flatnonzero(physchem_rows < 0)
+            missing_ids.update(dict.fromkeys(peptide_ids[i] for i in missing))
+            missing_rows += len(missing)
+            lipophilicity_rows = _lookup(lipophilicity_table, peptide_ids)
+            for header, column in physchem_joined:
+                batch[header] = column[physchem_rows].tolist()
+            for header, column in lipophilicity_joined:
+                batch[header] = column[lipophilicity_rows].tolist()
+            writer.writerows(zip(*(batch[h] for h in unified_headers)))
+    return row_count, row_count - missing_rows, missing_ids, missing_rows
+
 def create_unified_csv(
     physchem_file: str | None = None,
     normalized_file: str | None = None,
@@ -36,97 +130,78 @@ def create_unified_csv(
     
     try:
         # Step 1: Load physicochemical properties by Peptide ID
-        physchem_data = {}
-        physchem_headers = []
-        
-        with open(physchem_file, encoding=Config.CSV_ENCODING) as f:
-            reader = csv.DictReader(f)
-            if reader.fieldnames is None:
-                raise FileProcessingError(f"No headers found in {physchem_file}", filename=physchem_file)
-            physchem_headers = [h for h in reader.fieldnames if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS"]]
-            
-            for row in reader:
-                peptide_id = row["Peptide ID"]
-                # Store only the physchem-specific columns (exclude basic peptide info)
-                physchem_props = {h: row.get(h, "") for h in physchem_headers}
-                physchem_data[peptide_id] = physchem_props
+        physchem_fields, physchem_cols = _read_columns(physchem_file)
+        if physchem_fields is None:
+            raise FileProcessingError(f"No headers found in {physchem_file}", filename=physchem_file)
+        physchem_headers = [h for h in physchem_fields if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS"]]
+        physchem_ids = _last_positions(physchem_cols["Peptide ID"]) if physchem_cols else {}
         
-        logger.info(f"Loaded physicochemical data for {len(physchem_data)} peptides")
+        logger.info(f"Loaded physicochemical data for {len(physchem_ids)} peptides")
         logger.info(f"Physicochemical properties: {len(physchem_headers)} columns")
         
         # Step 1b: Load lipophilicity data by Peptide ID
-        lipophilicity_data = {}
         lipophilicity_headers = []
+        lipophilicity_cols = {}
+        lipophilicity_ids = {}
         
         try:
-            with open(lipophilicity_file, encoding=Config.CSV_ENCODING) as f:
-                reader = csv.DictReader(f)
-                if reader.fieldnames is not None:
-                    lipophilicity_headers = [h for h in reader.fieldnames if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "SMILES"]]
-                    
-                    for row in reader:
-                        peptide_id = row["Peptide ID"]
-                        lipophilicity_props = {h: row.get(h, "") for h in lipophilicity_headers}
-                        lipophilicity_data[peptide_id] = lipophilicity_props
+            lipophilicity_fields, lipophilicity_cols = _read_columns(lipophilicity_file)
+            if lipophilicity_fields is not None:
+                lipophilicity_headers = [h for h in lipophilicity_fields if h not in ["Peptide ID", "N TERMINUS", "SEQUENCE", "SMILES"]]
+                if lipophilicity_cols:
+                    lipophilicity_ids = _last_positions(lipophilicity_cols["Peptide ID"])
             
-            logger.info(f"Loaded lipophilicity data for {len(lipophilicity_data)} peptides")
+            logger.info(f"Loaded lipophilicity data for {len(lipophilicity_ids)} peptides")
             logger.info(f"Lipophilicity properties: {len(lipophilicity_headers)} columns")
         except FileNotFoundError:
             logger.warning(f"Lipophilicity file not found: {lipophilicity_file}")
             lipophilicity_headers = []
         
-        # Step 2: Process normalized activity data and merge with physchem and lipophilicity
-        unified_rows = []
+        # Step 2: Join physchem and lipophilicity onto the normalized activity rows
+        activity_headers = _read_header(normalized_file)
         
-        with open(normalized_file, encoding=Config.CSV_ENCODING) as f:
-            reader = csv.DictReader(f)
-            
-            # Create unified header: normalized activity columns + physchem columns + lipophilicity columns
-            if reader.fieldnames is None:
-                raise FileProcessingError(f"No headers found in {normalized_file}", filename=normalized_file)
-            activity_headers = list(reader.fieldnames)
-            unified_headers = activity_headers + physchem_headers + lipophilicity_headers
-            
-            row_count = 0
-            matched_count = 0
-            
-            for row in reader:
-                row_count += 1
-                peptide_id = row["Peptide ID"]
-                
-                # Create unified row starting with activity/normalized data
-                unified_row = dict(row)
-                
-                # Add physicochemical properties if available
-                if peptide_id in physchem_data:
-                    unified_row.update(physchem_data[peptide_id])
-                    matched_count += 1
-                else:
-                    # Fill missing physchem data with empty strings
-                    for header in physchem_headers:
-                        unified_row[header] = ""
-                    logger.warning(f"No physicochemical data found for Peptide ID {peptide_id}")
-                
-                # Add lipophilicity properties if available
-                if peptide_id in lipophilicity_data:
-                    unified_row.update(lipophilicity_data[peptide_id])
-                else:
-                    # Fill missing lipophilicity data with empty strings
-                    for header in lipophilicity_headers:
-                        unified_row[header] = ""
-                
-                unified_rows.append(unified_row)
+        # Create unified header: normalized activity columns + physchem columns + lipophilicity columns
+        if activity_headers is None:
+            raise FileProcessingError(f"No headers found in {normalized_file}", filename=normalized_file)
+        unified_headers = activity_headers + physchem_headers + lipophilicity_headers
+        # A repeated name maps to its last column, as in a csv.DictReader row
+        id_col = {name: i for i, name in enumerate(activity_headers)}["Peptide ID"] if activity_headers else None
         
-        logger.info(f"Processed {row_count} activity rows, matched {matched_count} with physchem data")
+        # Joined values override activity columns of the same name; missing data is ""
+        physchem = (_lookup_table(physchem_ids), [(h, _with_missing(physchem_cols[h])) for h in physchem_headers])
+        lipophilicity = (
+            _lookup_table(lipophilicity_ids),
+            [(h, _with_missing(lipophilicity_cols[h])) for h in lipophilicity_headers],
+        )
+        
+        # The activity file is streamed UNIFIED_BATCH_ROWS rows at a time into a temp file,
+        # which replaces the output only once it is complete
+        tmp_file = f"{output_file}.tmp"
+        try:
+            stats = _write_unified(
+                tmp_file, activity_headers, unified_headers, id_col, physchem, lipophilicity,
+                _column_batches(normalized_file, len(activity_headers)),
+            )
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        os.replace(tmp_file, output_file)
+        row_count, matched_count, missing_ids, missing_rows = stats
+        
+        if missing_ids:
+            # One summary rather than a warning per activity row
+            missing_ids = list(missing_ids)
+            logger.warning(
+                f"No physicochemical data found for {len(missing_ids)} peptides "
+                f"({missing_rows} activity rows), first {min(len(missing_ids), 10)}: "
+                f"{', '.join(map(str, missing_ids[:10]))}"
+            )
         
-        # Step 3: Write unified CSV
-        with open(output_file, "w", encoding=Config.CSV_ENCODING, newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=unified_headers)
-            writer.writeheader()
-            writer.writerows(unified_rows)
+        logger.info(f"Processed {row_count} activity rows, matched {matched_count} with physchem data")
         
         logger.info(f"Successfully created unified CSV: {output_file}")
-        logger.info(f"Final CSV contains {len(unified_rows)} rows and {len(unified_headers)} columns")
+        logger.info(f"Final CSV contains {row_count} rows and {len(unified_headers)} columns")
         
         # Log summary of what's included
         logger.info("Unified CSV includes:")
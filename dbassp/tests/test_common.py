@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+from src.core import common
+from src.core.exceptions import DataValidationError, FileProcessingError
+
+INPUTS = [
+    "Name,ID\na,51\nb,DBAASPS_52\nc,\nd,x12\ne, 53 \n",
+    "Peptide ID,Name\n51,a\n\n52,b,c,d\n53\n",  # blank line, long and short rows
+    'Name,peptide id\na,"5\n1"\nb,"52"x\nc,54\n',
+]
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(text)
+
+
+def _load(caplog, path):
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        ids = common.load_ids(str(path))
+    return ids, [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+
+
+def test_load_ids_prefixes_and_bad_rows(tmp_path, caplog):
+    path = tmp_path / "peptides.csv"
+    _write(path, INPUTS[0])
+
+    assert _load(caplog, path) == (
+        [51, 52, 53],
+        ["Empty ID in row 4, skipping", "Invalid ID format 'x12' in row 5"],
+    )
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_load_ids_same_as_csv_module(tmp_path, caplog, text):
+    path = tmp_path / "peptides.csv"
+    _write(path, text)
+    col = common._find_id_column(text.split("\n", 1)[0].split(","))
+
+    ids, warnings = _load(caplog, path)
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        expected = common._load_ids_csv(str(path), col)
+
+    assert ids == expected
+    assert warnings == [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+
+
+def test_load_ids_falls_back_to_csv_module(tmp_path, caplog):
+    path = tmp_path / "peptides.csv"
+    _write(path, 'Peptide ID\n51\n"52\n')  # unterminated quote: pandas rejects the file
+
+    ids, warnings = _load(caplog, path)
+
+    assert ids == [51, 52]
+    assert warnings[0].startswith(f"Falling back to csv module for {path}")
+
+
+def test_load_ids_errors(tmp_path):
+    path = tmp_path / "peptides.csv"
+    _write(path, "Name,Sequence\na,KLK\n")
+    with pytest.raises(FileProcessingError):
+        common.load_ids(str(tmp_path / "missing.csv"))
+    with pytest.raises(DataValidationError):
+        common.load_ids(str(path))
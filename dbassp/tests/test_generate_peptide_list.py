@@ -0,0 +1,57 @@
+import csv
+
+import pytest
+
+from src.processors import generate_peptide_list as gpl
+
+HEADER = "Peptide ID,N TERMINUS,SEQUENCE,C TERMINUS"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "data" / "input").mkdir(parents=True)
+    (tmp_path / "data" / "output").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _generate(workdir, text):
+    with open(workdir / "data/input/peptides_C12.csv", "w", encoding="utf-8-sig", newline="") as f:
+        f.write(text)
+    gpl.generate_peptide_list("C12")
+    path = workdir / "data/output/peptides_C12_list.csv"
+    return path.read_bytes() if path.exists() else None
+
+
+def test_pandas_path_matches_csv_fallback(workdir, monkeypatch, capsys):
+    text = HEADER + "\n1,C12,klk,AMD\n2,C12,KLK, amd \n3,C12,KXK,\n4,C12,KLK,\n5,C12,\"k,k\",Amd\n"
+    output = _generate(workdir, text)
+    monkeypatch.setattr(gpl, "_peptide_list_frame", lambda *args: None)
+    assert _generate(workdir, text) == output
+
+    rows = list(csv.reader(output.decode("utf-8-sig").splitlines()))
+    assert rows[0] == HEADER.split(",") + ["total_sequence", "filtered_sequence"]
+    # AMD -> 00, anything else -> 01; sequences with X and repeats are filtered out
+    assert [r[4:] for r in rows[1:]] == [
+        ["ZZZKLK00", "ZZZKLK00"],
+        ["ZZZKLK00", ""],
+        ["ZZZKXK01", ""],
+        ["ZZZKLK01", "ZZZKLK01"],
+        ["ZZZK,K00", "ZZZK,K00"],
+    ]
+    out = capsys.readouterr().out
+    assert "Secuencias con X (filtradas): 1" in out
+    assert "Secuencias únicas válidas: 3" in out
+
+
+def test_ragged_rows_use_csv_fallback(workdir):
+    output = _generate(workdir, HEADER + "\n1,C12,KK\n2,C12,LL,AMD\n")
+    rows = list(csv.reader(output.decode("utf-8-sig").splitlines()))
+    assert [r[-2:] for r in rows[1:]] == [["ZZZKK01", "ZZZKK01"], ["ZZZLL00", "ZZZLL00"]]
+
+
+def test_failed_run_leaves_no_output(workdir, capsys):
+    # A row longer than the header makes csv.DictWriter fail
+    assert _generate(workdir, HEADER + "\n1,C12,KK,AMD,extra\n") is None
+    assert sorted(p.name for p in (workdir / "data/output").iterdir()) == []
+    assert "Error: dict contains fields not in fieldnames: None" in capsys.readouterr().out
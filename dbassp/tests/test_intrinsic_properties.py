@@ -0,0 +1,48 @@
+import csv
+
+from src.processors import intrinsic_properties
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def _read(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_lipophilicity_overrides_physchem_columns(tmp_path):
+    physchem, lipophilicity, output = tmp_path / "physchem.csv", tmp_path / "lipo.csv", tmp_path / "out.csv"
+    _write(physchem, [
+        ["Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS", "Net Charge", "logP", "Hydro", "Hydro"],
+        ["1", "C12", "KLK", "AMD", "nan", "phys", "a", "b"],
+        ["2", "", "KK", "", "inf", "phys", "c", "d"],
+        ["3", "C8", "LL", "", "2", "phys", "e", "f"],
+    ])
+    _write(lipophilicity, [
+        ["Peptide ID", "N TERMINUS", "SEQUENCE", "SMILES", "logP"],
+        ["1", "C12", "KLK", "CC", "old"],
+        ["3", "C8", "LL", "NN", "1.5"],
+        ["1", "C12", "KLK", "CCC", "0.5"],  # a repeated ID keeps its last row
+    ])
+
+    intrinsic_properties.create_intrinsic_csv(
+        str(physchem), str(lipophilicity), str(tmp_path / "no_min_list.txt"), str(output)
+    )
+
+    header, *rows = _read(output)
+    assert header == [
+        "Peptide ID", "N TERMINUS", "SEQUENCE", "C TERMINUS", "Net Charge", "logP", "Hydro", "Hydro",
+        "long_tail", "molecular_weight", "total_charge", "SMILES", "logP",
+    ]
+    by_name = [dict(zip(header, row)) for row in rows]
+    # Both logP columns carry the lipophilicity value; "" where the peptide has none
+    assert [(r[5], r[12]) for r in rows] == [("0.5", "0.5"), ("", ""), ("1.5", "1.5")]
+    assert [r["SMILES"] for r in by_name] == ["CCC", "", "NN"]
+    # A repeated physchem name repeats its last column
+    assert [(r[6], r[7]) for r in rows] == [("b", "b"), ("d", "d"), ("f", "f")]
+    # Non-finite Net Charge values parse as floats and stay non-finite
+    assert [r["total_charge"] for r in by_name] == ["nan", "inf", "1.00"]
+    assert [r["long_tail"] for r in by_name] == ["12", "", "8"]
@@ -0,0 +1,60 @@
+import csv
+import logging
+
+from src.collectors import lipophilicity
+from src.core import common
+from src.core.config import Config
+
+PEPTIDES = {
+    1: {"id": 1, "sequence": "KLK", "cTerminus": {"name": "AMD"}},
+    2: {"id": 2, "sequence": " KLK ", "cTerminus": {"name": "AMD"}},  # same task as peptide 1
+    3: None,  # fetch failed
+    4: {"id": 4, "sequence": ""},
+    5: {"id": 5, "sequence": "123"},  # no SMILES for this sequence
+    6: {"id": 6, "sequence": "KK", "cTerminus": None},
+}
+
+
+def _read(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_run_writes_rows_in_input_order(tmp_path, monkeypatch, caplog, capsys):
+    output = tmp_path / "lipophilicity.csv"
+    monkeypatch.setattr(Config, "_current_nterminus", "C12")
+    monkeypatch.setattr(Config, "OUTPUT_LIPOPHILICITY_CSV", str(output))
+    monkeypatch.setattr(common, "load_ids", lambda: list(PEPTIDES))
+    monkeypatch.setattr(common, "fetch_many", lambda ids, label: ((pid, PEPTIDES[pid]) for pid in ids))
+
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        lipophilicity.run()
+
+    header, *rows = _read(output)
+    assert header == ["Peptide ID", "N TERMINUS", "SEQUENCE", "SMILES", "logP", "logD"]
+    assert [r[:3] for r in rows] == [["1", "C12", "KLK"], ["2", "C12", "KLK"], ["6", "C12", "KK"]]
+    assert rows[0][3:] == rows[1][3:]
+    for (_, nterm, seq, smiles, logp, logd), cterm in zip(rows, ["AMD", "AMD", ""]):
+        assert smiles == lipophilicity.sequence_to_smiles(seq, nterminus=nterm, cterminus=cterm)
+        assert logp == str(lipophilicity.calculate_logp(smiles))
+        assert logd == str(lipophilicity.calculate_logd(smiles, sequence=seq, ph=7.0, nterminus=nterm, cterminus=cterm))
+
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert "Failed to generate SMILES for sequence: 123" in warnings
+    assert warnings[-1] == "Failed to process 3 peptides: [3, 4, 5]"
+    assert not (tmp_path / "lipophilicity.csv.tmp").exists()
+    assert "Peptide 5 ... fail (SMILES generation)" in capsys.readouterr().out
+
+
+def test_run_keeps_existing_output_when_nothing_is_calculated(tmp_path, monkeypatch):
+    output = tmp_path / "lipophilicity.csv"
+    output.write_text("previous")
+    monkeypatch.setattr(Config, "_current_nterminus", "C12")
+    monkeypatch.setattr(Config, "OUTPUT_LIPOPHILICITY_CSV", str(output))
+    monkeypatch.setattr(common, "load_ids", lambda: [3, 5])
+    monkeypatch.setattr(common, "fetch_many", lambda ids, label: ((pid, PEPTIDES[pid]) for pid in ids))
+
+    lipophilicity.run()
+
+    assert output.read_text() == "previous"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["lipophilicity.csv"]
@@ -0,0 +1,37 @@
+import random
+
+from src.collectors.normalize_activity import calc_mw, calc_mw_batch
+from src.core.config import Config
+
+
+def _baseline_mw(seq, nterm, cterm):
+    # Formula of the original calc_mw; sum() is compensated on Python 3.12+
+    mw = sum(Config.AA_MASS.get(a.upper(), 110.0) for a in (seq or "")) + Config.H2O_MASS
+    if nterm and nterm.upper() in Config.NTERM_MASS:
+        mw += Config.NTERM_MASS[nterm.upper()]
+    if cterm and cterm.upper() in Config.CTERM_MASS:
+        mw += Config.CTERM_MASS[cterm.upper()]
+    return mw
+
+
+def _peptides():
+    rng = random.Random(0)
+    letters = "".join(Config.AA_MASS) + "xZ"
+    nterms = [None, "", "C12", "c16", "ACT", "???"]
+    cterms = [None, "", "AMD", "amd", "FREE"]
+    peptides = [("", None, None), (None, "C12", "AMD"), ("kLk", "C8", "amd"), ("ÿ", None, None)]
+    for _ in range(500):
+        seq = "".join(rng.choice(letters) for _ in range(rng.randint(1, 60)))
+        peptides.append((seq, rng.choice(nterms), rng.choice(cterms)))
+    return peptides
+
+
+def test_calc_mw_matches_baseline_formula():
+    for seq, nterm, cterm in _peptides():
+        assert calc_mw(seq, nterm, cterm) == _baseline_mw(seq, nterm, cterm)
+
+
+def test_calc_mw_batch_matches_calc_mw():
+    seqs, nterms, cterms = zip(*_peptides())
+    batch = calc_mw_batch(seqs, nterms, cterms)
+    assert batch.tolist() == [_baseline_mw(*p) for p in zip(seqs, nterms, cterms)]
@@ -0,0 +1,67 @@
+import csv
+import logging
+
+import pytest
+
+from src.collectors import normalize_activity
+
+HEADER = "Peptide ID,N TERMINUS,SEQUENCE,C TERMINUS,targetSpecies,concentration,unit,note"
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_embedded_crlf_reads_as_lf(tmp_path):
+    infile, outfile = tmp_path / "activity.csv", tmp_path / "normalized.csv"
+    _write(infile, HEADER + '\r\n1,C12,KLK,AMD,Escherichia coli,50,µM,"line one\r\nline two"\r\n')
+
+    normalize_activity.run(str(infile), str(outfile))
+
+    rows = _read(outfile)
+    assert rows[1][rows[0].index("note")] == "line one\nline two"
+
+
+def _run_warnings(caplog, infile, outfile):
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        normalize_activity.run(str(infile), str(outfile))
+    return [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+
+
+def test_row_numbers_continue_across_batches(tmp_path, monkeypatch, caplog):
+    infile, outfile = tmp_path / "activity.csv", tmp_path / "normalized.csv"
+    rows = [f"{i},C12,KLK,AMD,E. coli,{'bad' if i in (1, 120) else '50'},µM,x" for i in range(1, 400)]
+    monkeypatch.setattr(normalize_activity, "NORMALIZE_CHUNK_ROWS", 50)
+    # A blank line is skipped and a short row padded, as csv.DictReader reads them
+    _write(infile, "\n".join([HEADER] + rows + ["", "400,C12,KLK"]) + "\n")
+
+    warnings = _run_warnings(caplog, infile, outfile)
+
+    assert [w for w in warnings if "'bad'" in w] == [
+        "Invalid concentration value: 'bad' (CSV row 2)",
+        "Invalid concentration value: 'bad' (CSV row 2)",
+        "Invalid concentration value: 'bad' (CSV row 121)",
+        "Invalid concentration value: 'bad' (CSV row 121)",
+    ]
+    assert len(_read(outfile)) == 401
+
+
+def test_failed_run_leaves_no_output(tmp_path, monkeypatch):
+    infile, outfile = tmp_path / "activity.csv", tmp_path / "normalized.csv"
+    _write(infile, HEADER + "\n1,C12,KLK,AMD,E. coli,50,µM,x\n")
+
+    def fail(*args):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(normalize_activity, "_normalize_columns", fail)
+    with pytest.raises(ValueError):
+        normalize_activity.run(str(infile), str(outfile))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["activity.csv"]
@@ -0,0 +1,73 @@
+import csv
+import logging
+
+from src.processors import unified_results
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def _unified(tmp_path, physchem, normalized, lipophilicity=None):
+    files = {name: tmp_path / f"{name}.csv" for name in ("physchem", "normalized", "lipophilicity", "out")}
+    _write(files["physchem"], physchem)
+    _write(files["normalized"], normalized)
+    if lipophilicity is not None:
+        _write(files["lipophilicity"], lipophilicity)
+    unified_results.create_unified_csv(*(str(files[n]) for n in ("physchem", "normalized", "lipophilicity", "out")))
+    return _read(files["out"])
+
+
+PHYSCHEM = (
+    "Peptide ID,N TERMINUS,SEQUENCE,C TERMINUS,Net Charge,Hydro\n"
+    "1,C12,KLK,AMD,3,old\n"
+    "2,C12,KK,,2,h2\n"
+    "1,C12,KLK,AMD,4,h1\n"  # a repeated ID keeps its last row
+)
+LIPOPHILICITY = "Peptide ID,N TERMINUS,SEQUENCE,SMILES,logP\n2,C12,KK,CC,0.5\n"
+
+
+def test_join_overrides_activity_columns_and_reports_missing(tmp_path, caplog):
+    normalized = (
+        "Peptide ID,SEQUENCE,Hydro,logP,species\n"
+        "1,KLK,act,act,E. coli\n"
+        "3,LL,act,act,E. coli\n"
+        "\n"
+        "2,KK\n"  # blank lines are skipped and short rows padded, as csv.DictReader does
+        "3,LL,act,act,S. aureus\n"
+    )
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        rows = _unified(tmp_path, PHYSCHEM, normalized, LIPOPHILICITY)
+
+    header, *rows = rows
+    assert header == ["Peptide ID", "SEQUENCE", "Hydro", "logP", "species", "Net Charge", "Hydro", "logP"]
+    # Joined values replace activity columns of the same name; missing data is ""
+    assert rows == [
+        ["1", "KLK", "h1", "", "E. coli", "4", "h1", ""],
+        ["3", "LL", "", "", "E. coli", "", "", ""],
+        ["2", "KK", "h2", "0.5", "", "2", "h2", "0.5"],
+        ["3", "LL", "", "", "S. aureus", "", "", ""],
+    ]
+    assert [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING] == [
+        "No physicochemical data found for 1 peptides (2 activity rows), first 1: 3"
+    ]
+
+
+def test_join_across_batches_without_lipophilicity(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(unified_results, "UNIFIED_BATCH_ROWS", 2)
+    ids = ["1", "2", "3", "2", "1"]
+    normalized = "Peptide ID,species\n" + "".join(f"{i},sp{n}\n" for n, i in enumerate(ids))
+
+    with caplog.at_level(logging.WARNING, logger="dbaasp_pipeline"):
+        header, *rows = _unified(tmp_path, PHYSCHEM, normalized)
+
+    assert header == ["Peptide ID", "species", "Net Charge", "Hydro"]
+    assert [r[2:] for r in rows] == [["4", "h1"], ["2", "h2"], ["", ""], ["2", "h2"], ["4", "h1"]]
+    assert [r[:2] for r in rows] == [[i, f"sp{n}"] for n, i in enumerate(ids)]
+    assert any("Lipophilicity file not found" in r.getMessage() for r in caplog.records)